@@ -1,23 +1,116 @@
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, request, jsonify, render_template, send_file, Response, stream_with_context
 import os
-import torch
+import threading
+import time
+import uuid
 import json
 from werkzeug.utils import secure_filename
-from utils.neural_codec import NeuralCodec
+from utils.lazy import LazyResource
 from utils.text_processor import TextProcessor
+from compression.streaming import Compressor, Decompressor
+from utils.result_cache import ResultCache
+from utils.jobs import JobQueue, JobStore, status_view
+from utils.wire_format import VERSION as WIRE_VERSION, payload_to_json
+from utils.model_registry import ModelRegistry, IncompatibleModelError
 import tempfile
 import zipfile
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+app.config['BATCH_MAX_SIZE'] = 16       # requests per forward pass
+app.config['BATCH_MAX_WAIT_MS'] = 5     # how long to wait for a batch to fill
+app.config['RESULT_CACHE_MAX_BYTES'] = 64 * 1024 * 1024
+app.config['RESULT_CACHE_DIR'] = os.path.join('static', 'compressed', 'cache')  # None = memory only
+app.config['RESULT_CACHE_DISK_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+# WARM_UP=1 loads the model in a background thread at import. Leave it off under
+# gunicorn --preload (a thread started before fork can deadlock the workers) and
+# call app.neural_codec.warm_up() from a post_fork hook instead.
+app.config['WARM_UP'] = os.environ.get('WARM_UP', '0') == '1'
+app.config['NEURAL_CODEC_ARTIFACT'] = os.environ.get('NEURAL_CODEC_ARTIFACT')  # INT8 TorchScript dir (python -m utils.model_export)
+app.config['MODEL_REGISTRY'] = os.environ.get('MODEL_REGISTRY', 'models')  # trained weights (python -m utils.neural_codec)
+# Background jobs (/jobs): worker processes, and how long finished results are kept.
+# Job state lives in a SQLite file under JOB_FOLDER, so any web worker can answer
+# for any job; each web worker that submits jobs runs its own JOB_WORKERS processes.
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_TTL_SECONDS'] = int(os.environ.get('JOB_TTL_SECONDS', 3600))
+app.config['JOB_FOLDER'] = os.path.join('static', 'jobs')  # job inputs/outputs, removed on expiry
+# Pin one version at start so every worker serves (and caches) the same weights
+app.config['NEURAL_CODEC_VERSION'] = int(os.environ.get('NEURAL_CODEC_VERSION') or
+                                         ModelRegistry(app.config['MODEL_REGISTRY']).latest('neural_codec') or 0)
 
-# Initialize neural codec
-neural_codec = NeuralCodec()
+def build_neural_codec():
+    # torch/transformers are imported here so importing app.py stays fast
+    from utils.neural_codec import NeuralCodec
+    from utils.batching import BatchedNeuralCodec
+    
+    # Concurrent requests share forward passes
+    return BatchedNeuralCodec(
+        NeuralCodec(
+            artifact_dir=app.config['NEURAL_CODEC_ARTIFACT'],
+            registry_dir=app.config['MODEL_REGISTRY'],
+            version=app.config['NEURAL_CODEC_VERSION'] or None
+        ),
+        max_batch_size=app.config['BATCH_MAX_SIZE'],
+        max_wait_ms=app.config['BATCH_MAX_WAIT_MS']
+    )
+
+# The neural codec is built on first use (or by the warm-up thread)
+neural_codec = LazyResource(build_neural_codec, 'neural_codec')
+if app.config['WARM_UP']:
+    neural_codec.warm_up()
+
+def build_job_store():
+    return JobStore(os.path.join(app.config['JOB_FOLDER'], 'jobs.sqlite3'))
+
+def build_job_queue():
+    from utils.job_tasks import TASKS
+    
+    return JobQueue(TASKS, job_store.get().path, max_workers=app.config['JOB_WORKERS'],
+                    ttl_seconds=app.config['JOB_TTL_SECONDS'])
+
+# Both are created by the first /jobs request, so importing app.py writes nothing.
+# Status lookups only read the store; worker processes are started by the first job
+job_store = LazyResource(build_job_store, 'job_store')
+job_queue = LazyResource(build_job_queue, 'job_queue')
 text_processor = TextProcessor()
+result_cache = ResultCache(app.config['RESULT_CACHE_MAX_BYTES'], app.config['RESULT_CACHE_DIR'],
+                           app.config['RESULT_CACHE_DISK_MAX_BYTES'])
 
 ALLOWED_EXTENSIONS = {'txt', 'json', 'csv'}
 
+# Open chunked-upload sessions: id -> StreamSession
+# (kept per process; run a single worker or use sticky sessions)
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_IDLE_SECONDS = 600   # sessions unused for this long are dropped
+stream_sessions = {}
+stream_lock = threading.Lock()
+
+class StreamSession:
+    """A Compressor/Decompressor plus a lock that serializes its chunks"""
+    
+    def __init__(self, codec):
+        self.codec = codec
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+def sweep_stream_sessions():
+    """Drop idle sessions (never one that is busy with a chunk)"""
+    cutoff = time.monotonic() - STREAM_IDLE_SECONDS
+    with stream_lock:
+        idle = [stream_id for stream_id, session in stream_sessions.items()
+                if session.last_used < cutoff and not session.lock.locked()]
+        for stream_id in idle:
+            del stream_sessions[stream_id]
+
+def get_stream_session(stream_id, pop=False):
+    sweep_stream_sessions()
+    with stream_lock:
+        session = stream_sessions.pop(stream_id, None) if pop else stream_sessions.get(stream_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+    return session
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -31,6 +124,8 @@ def compress_text():
         # Get compression parameters
         compression_level = float(request.form.get('compression_level', 0.5))
         quality = float(request.form.get('quality', 0.8))
+        # 'binary' (default) returns the packed payload, 'json' a readable form for debugging
+        output_format = request.args.get('format') or request.form.get('format', 'binary')
         
         # Handle file upload
         if 'file' in request.files:
@@ -52,48 +147,286 @@ def compress_text():
         # Preprocess text
         processed_text = text_processor.preprocess(text)
         
-        # Apply neural codec compression
-        compressed_data = neural_codec.compress(
-            processed_text, 
-            compression_level=compression_level,
-            quality=quality
-        )
+        # Identical text + parameters give identical output, so serve repeats from cache
+        cache_key = ResultCache.make_key(processed_text, compression_level, quality, WIRE_VERSION,
+                                         app.config['NEURAL_CODEC_ARTIFACT'],
+                                         app.config['NEURAL_CODEC_VERSION'])
+        compressed_data = result_cache.get(cache_key)
+        cached = compressed_data is not None
+        if not cached:
+            # Apply neural codec compression
+            compressed_data = neural_codec.get().compress(
+                processed_text, 
+                compression_level=compression_level,
+                quality=quality
+            )
+            result_cache.put(cache_key, compressed_data)
         
         # Calculate compression ratio
         original_size = len(text.encode('utf-8'))
-        compressed_size = len(compressed_data['encoded'])
+        compressed_size = len(compressed_data)
         compression_ratio = (1 - compressed_size / original_size) * 100
         
+        if output_format != 'json':
+            return Response(compressed_data, mimetype='application/octet-stream', headers={
+                'X-Original-Size': str(original_size),
+                'X-Compressed-Size': str(compressed_size),
+                'X-Compression-Ratio': f"{compression_ratio:.2f}%",
+                'X-Cached': str(cached).lower()
+            })
+        
         return jsonify({
             'success': True,
             'original_size': original_size,
             'compressed_size': compressed_size,
             'compression_ratio': f"{compression_ratio:.2f}%",
-            'compressed_data': compressed_data
+            'compressed_data': payload_to_json(compressed_data),
+            'cached': cached
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(result_cache.get_stats())
+
+@app.route('/batch/stats')
+def batch_stats():
+    if not neural_codec.ready:
+        return jsonify({'error': 'Model not loaded yet'}), 503
+    return jsonify(neural_codec.get().get_stats())
+
+@app.route('/health')
+def health():
+    """Liveness: the process is up"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    """Readiness: 200 once the model is loaded, 503 while loading or failed"""
+    status = neural_codec.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+def save_job_upload(field):
+    """Store an uploaded file for a job; returns (path, name stem) or None"""
+    file = request.files.get(field)
+    if file is None or not file.filename:
+        return None
+    prefix = uuid.uuid4().hex
+    filename = secure_filename(file.filename) or 'upload'
+    path = os.path.join(app.config['JOB_FOLDER'], f"{prefix}_{filename}")
+    file.save(path)
+    return path, f"{prefix}_{os.path.splitext(filename)[0]}"
+
+@app.route('/jobs/<task>', methods=['POST'])
+def submit_job(task):
+    """Queue BERT compression, DNN image compression or document conversion
+
+    Returns 202 with the job id; poll /jobs/<id> and fetch /jobs/<id>/result.
+    """
+    try:
+        queue = job_queue.get()
+        files = []
+        if task == 'bert_compress':
+            data = request.get_json(silent=True) or request.form
+            text = data.get('text', '')
+            if not text:
+                return jsonify({'error': 'No text provided'}), 400
+            kwargs = {
+                'text': text_processor.preprocess(text),
+                'compression_level': float(data.get('compression_level', 0.5)),
+                'quality': float(data.get('quality', 0.8)),
+                'artifact_dir': app.config['NEURAL_CODEC_ARTIFACT'],
+                'registry_dir': app.config['MODEL_REGISTRY'],
+                'version': app.config['NEURAL_CODEC_VERSION'] or None,
+            }
+        elif task in ('dnn_compress', 'convert_document'):
+            upload = save_job_upload('image' if task == 'dnn_compress' else 'file')
+            if upload is None:
+                return jsonify({'error': 'No file provided'}), 400
+            input_path, stem = upload
+            if task == 'dnn_compress':
+                output_path = os.path.join(app.config['JOB_FOLDER'], f"{stem}_dnn.png")
+                kwargs = {'quality': int(request.form.get('quality', 85))}
+            else:
+                format_type = request.form.get('format', 'word')
+                extension = {'word': 'docx', 'pdf': 'pdf'}.get(format_type)
+                if extension is None:
+                    os.remove(input_path)
+                    return jsonify({'error': 'Invalid format specified'}), 400
+                output_path = os.path.join(app.config['JOB_FOLDER'], f"{stem}.{extension}")
+                kwargs = {'format': format_type}
+            kwargs.update(input_path=input_path, output_path=output_path)
+            files = [input_path, output_path]
+        else:
+            return jsonify({'error': f'Unknown task: {task}'}), 404
+        
+        job_id = queue.submit(task, kwargs, files=files)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': f"/jobs/{job_id}",
+            'result_url': f"/jobs/{job_id}/result"
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def job_status_view(job_id):
+    job_store.get().expire(app.config['JOB_TTL_SECONDS'])
+    return status_view(job_store.get().get(job_id), app.config['JOB_TTL_SECONDS'])
+
+@app.route('/jobs/stats')
+def job_stats():
+    if job_queue.ready:
+        return jsonify(job_queue.get().get_stats())
+    # No job submitted from this process: report the shared table only
+    return jsonify({'jobs': job_store.get().counts(), 'ttl_seconds': app.config['JOB_TTL_SECONDS']})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    status = job_status_view(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """The result of a finished job; 409 (with the status) until then"""
+    job_store.get().expire(app.config['JOB_TTL_SECONDS'])
+    try:
+        state, result = job_store.get().result(job_id)
+    except KeyError:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if result is None:
+        # Failed and cancelled jobs never get a result
+        return jsonify(job_status_view(job_id)), {'failed': 500, 'cancelled': 410}.get(state, 409)
+    
+    if 'payload' in result:
+        return Response(result['payload'], mimetype='application/octet-stream', headers={
+            'X-Original-Size': str(result['original_size']),
+            'X-Compressed-Size': str(result['compressed_size'])
+        })
+    if 'output_path' in result:
+        return send_file(os.path.abspath(result['output_path']), as_attachment=True)
+    return jsonify(result)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if job_queue.ready:
+        state = job_queue.get().cancel(job_id)
+    else:
+        # Submitted by another web worker: its worker sees the flag in report_progress
+        state = job_store.get().request_cancel(job_id)
+    if state is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify({'success': True, 'job_id': job_id, 'state': state})
+
 @app.route('/decompress', methods=['POST'])
 def decompress_text():
     try:
-        compressed_data = request.get_json()
+        # Binary payload as the raw body, or the JSON debug form
+        if request.mimetype == 'application/octet-stream':
+            compressed_data = request.get_data()
+        else:
+            compressed_data = request.get_json()
         
         if not compressed_data:
             return jsonify({'error': 'No compressed data provided'}), 400
         
         # Decompress using neural codec
-        decompressed_text = neural_codec.decompress(compressed_data)
+        decompressed_text = neural_codec.get().decompress(compressed_data)
         
         return jsonify({
             'success': True,
             'decompressed_text': decompressed_text
         })
         
+    except IncompatibleModelError as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/stream/<mode>', methods=['POST'])
+def start_stream(mode):
+    """Open a chunked upload session for compress or decompress"""
+    try:
+        if mode == 'compress':
+            codec = Compressor(request.args.get('algorithm', 'huffman'))
+        elif mode == 'decompress':
+            codec = Decompressor()
+        else:
+            return jsonify({'error': f'Unknown stream mode: {mode}'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    sweep_stream_sessions()
+    stream_id = uuid.uuid4().hex
+    with stream_lock:
+        stream_sessions[stream_id] = StreamSession(codec)
+    return jsonify({'success': True, 'stream_id': stream_id})
+
+@app.route('/stream/<stream_id>/chunk', methods=['POST'])
+def stream_chunk(stream_id):
+    """Feed one uploaded chunk (raw request body)
+
+    Compression output is streamed back as it is produced. Decompression
+    reads the whole chunk (at most MAX_CONTENT_LENGTH) first, so corrupt
+    input is a 400 instead of a truncated 200 body; the session is dropped.
+    Concurrent chunks for one session are processed one at a time.
+    """
+    session = get_stream_session(stream_id)
+    if session is None:
+        return jsonify({'error': 'Unknown stream'}), 404
+    
+    if isinstance(session.codec, Decompressor):
+        with session.lock:
+            out = []
+            try:
+                while True:
+                    chunk = request.stream.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.append(session.codec.feed(chunk))
+            except Exception as e:
+                with stream_lock:
+                    stream_sessions.pop(stream_id, None)
+                return jsonify({'error': f'Invalid compressed data: {e}'}), 400
+            finally:
+                session.last_used = time.monotonic()
+        return Response(b''.join(out), mimetype='application/octet-stream')
+    
+    def generate():
+        with session.lock:
+            try:
+                while True:
+                    chunk = request.stream.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out = session.codec.feed(chunk)
+                    if out:
+                        yield out
+            finally:
+                session.last_used = time.monotonic()
+    
+    return Response(stream_with_context(generate()), mimetype='application/octet-stream')
+
+@app.route('/stream/<stream_id>/finish', methods=['POST'])
+def finish_stream(stream_id):
+    """Close the session and return the remaining output"""
+    session = get_stream_session(stream_id, pop=True)
+    if session is None:
+        return jsonify({'error': 'Unknown stream'}), 404
+    
+    try:
+        # Waits for a chunk that is still being processed
+        with session.lock:
+            tail = session.codec.flush()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(tail, mimetype='application/octet-stream')
+
 @app.route('/download/<format>')
 def download_file(format):
     try:
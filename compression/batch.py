@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .image_algorithms import ImageCompression
+
+# Batch image compression over a process pool.
+#
+#   python -m compression.batch uploads/ --out compressed/ --format webp \
+#       --quality 80 --report report.jsonl
+#
+# The source is a directory (searched recursively) or a manifest file with
+# one path per line. At most workers * QUEUE_FACTOR jobs are in flight, so
+# huge inputs never build a huge backlog of pending futures. Outputs newer
+# than their input are skipped. Manifest entries outside the manifest's
+# directory are written flat under out/EXTERNAL_DIR, never outside --out.
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
+OUTPUT_EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'webp': '.webp'}
+QUEUE_FACTOR = 4
+EXTERNAL_DIR = '_external'
+
+
+def safe_relative(path, base):
+    """path relative to base, or a flattened name when it lies outside base"""
+    try:
+        relative = os.path.normpath(os.path.relpath(path, base))
+    except ValueError:
+        relative = None     # other drive (Windows)
+    if relative is None or os.path.isabs(relative) or relative.split(os.sep)[0] == os.pardir:
+        digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:10]
+        relative = os.path.join(EXTERNAL_DIR, f"{digest}_{os.path.basename(path)}")
+    return relative
+
+
+def iter_inputs(source):
+    """Yield (path, path relative to the source root) for every input image"""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                    path = os.path.join(root, filename)
+                    yield path, os.path.relpath(path, source)
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, 'r', encoding='utf-8') as f:
+            for line in f:
+                path = line.strip()
+                if not path or path.startswith('#'):
+                    continue
+                if not os.path.isabs(path):
+                    path = os.path.join(base, path)
+                yield path, safe_relative(path, base)
+
+
+def output_path_for(relative, out_dir, fmt, quality):
+    relative = os.path.normpath(relative)
+    if os.path.isabs(relative) or relative.split(os.sep)[0] == os.pardir:
+        raise ValueError(f"Output would leave the output directory: {relative}")
+    name = os.path.splitext(relative)[0]
+    suffix = f"_q{quality}" if fmt != 'png' else ""
+    return os.path.join(out_dir, f"{name}{suffix}{OUTPUT_EXTENSIONS[fmt]}")
+
+
+def is_current(input_path, output_path):
+    """True if output exists and is not older than its input"""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+
+def compress_one(input_path, output_path, fmt, quality):
+    """Worker: compress a single image and return its report record"""
+    record = {'input': input_path, 'output': output_path, 'format': fmt, 'quality': quality}
+    start = time.perf_counter()
+    # Write under a temporary name so a crash never leaves a "current" output
+    partial = output_path + '.part'
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        compressor = ImageCompression()
+        if fmt == 'jpeg':
+            compressor.jpeg_compress(input_path, quality, partial)
+        elif fmt == 'png':
+            compressor.png_compress(input_path, partial)
+        else:
+            compressor.webp_compress(input_path, quality, partial)
+        os.replace(partial, output_path)
+        record['status'] = 'ok'
+        record['original_size'] = os.path.getsize(input_path)
+        record['compressed_size'] = os.path.getsize(output_path)
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run_batch(source, out_dir, fmt='jpeg', quality=85, workers=None, report=None, force=False):
+    """Compress every image under source into out_dir; returns a summary dict"""
+    if fmt not in OUTPUT_EXTENSIONS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    workers = workers or os.cpu_count() or 1
+    summary = {'ok': 0, 'skipped': 0, 'error': 0, 'original_size': 0, 'compressed_size': 0}
+    report_file = open(report, 'a', encoding='utf-8') if report else None
+
+    def record_result(record):
+        summary[record['status']] += 1
+        summary['original_size'] += record.get('original_size', 0)
+        summary['compressed_size'] += record.get('compressed_size', 0)
+        if report_file:
+            report_file.write(json.dumps(record) + '\n')
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for input_path, relative in iter_inputs(source):
+                output_path = output_path_for(relative, out_dir, fmt, quality)
+                if not force and is_current(input_path, output_path):
+                    record_result({'input': input_path, 'output': output_path, 'status': 'skipped'})
+                    continue
+
+                # Bounded in-flight queue
+                if len(pending) >= workers * QUEUE_FACTOR:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record_result(future.result())
+                pending.add(pool.submit(compress_one, input_path, output_path, fmt, quality))
+
+            for future in wait(pending).done:
+                record_result(future.result())
+    finally:
+        if report_file:
+            report_file.close()
+
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compress a directory or manifest of images in parallel")
+    parser.add_argument('source', help="directory of images or manifest file (one path per line)")
+    parser.add_argument('--out', required=True, help="output directory")
+    parser.add_argument('--format', default='jpeg', choices=sorted(OUTPUT_EXTENSIONS))
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--report', help="append one JSON line per image to this file")
+    parser.add_argument('--force', action='store_true', help="recompress even if the output is current")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.source, args.out, args.format, args.quality,
+                        args.workers, args.report, args.force)
+    print(json.dumps(summary))
+    return 1 if summary['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+# Colour planes for the DCT and DWT codecs.
+#
+# Colour images are coded as Y, Cb and Cr float planes (0-255), optionally
+# with 4:2:0 chroma subsampling: Cb and Cr averaged over 2x2 pixels and
+# brought back with a bilinear resize. Planes are independent, so they are
+# transformed concurrently on a shared thread pool; NumPy and pywt release
+# the GIL in their inner loops.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def plane_pool():
+    """Shared thread pool for per-plane work, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=min(3, os.cpu_count() or 1),
+                                       thread_name_prefix='planes')
+    return _pool
+
+
+def map_planes(fn, *iterables):
+    """list(map(fn, ...)) with one task per plane on the plane pool"""
+    args = list(zip(*iterables))
+    if len(args) < 2:
+        return [fn(*a) for a in args]
+    return list(plane_pool().map(lambda a: fn(*a), args))
+
+
+def downsample(plane):
+    """2x2 box average (edge padded to even size)"""
+    h, w = plane.shape
+    if h % 2 or w % 2:
+        plane = np.pad(plane, ((0, h % 2), (0, w % 2)), mode='edge')
+    return plane.reshape(plane.shape[0] // 2, 2, plane.shape[1] // 2, 2).mean(axis=(1, 3))
+
+
+def upsample(plane, shape):
+    """Bilinear resize of a plane to shape (height, width)"""
+    if plane.shape == tuple(shape):
+        return plane
+    img = Image.fromarray(np.asarray(plane, dtype=np.float32), mode='F')
+    return np.asarray(img.resize((shape[1], shape[0]), Image.BILINEAR))
+
+
+def split_planes(img, subsample=False):
+    """Grayscale images give one plane, anything else Y, Cb, Cr
+
+    subsample halves Cb and Cr in both directions (4:2:0).
+    """
+    if img.mode not in ('L', 'YCbCr'):
+        img = img.convert('L' if img.mode in ('1', 'I', 'F') else 'YCbCr')
+    planes = [np.asarray(band, dtype=np.float32) for band in img.split()]
+    if subsample and len(planes) == 3:
+        planes[1:] = [downsample(p) for p in planes[1:]]
+    return planes
+
+
+def merge_planes(planes):
+    """Inverse of split_planes: an 'L' or RGB image"""
+    shape = planes[0].shape
+    bands = [Image.fromarray(np.clip(np.rint(upsample(p, shape)), 0, 255).astype(np.uint8))
+             for p in planes]
+    if len(bands) == 1:
+        return bands[0]
+    return Image.merge('YCbCr', bands).convert('RGB')
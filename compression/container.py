@@ -0,0 +1,274 @@
+import os
+import struct
+import numpy as np
+import pywt
+from PIL import Image
+from .dct import to_blocks, from_blocks, forward_dct, inverse_dct, threshold_absolute
+from .huffman import huffman_encode, huffman_decode
+from .color import split_planes, merge_planes, map_planes
+
+# Entropy-coded containers for the DCT (.dctc) and DWT (.dwtc) image codecs.
+#
+# Coefficients are quantized to integers, scanned (zig-zag inside each DCT
+# block, subband raster for DWT) and split into two byte streams: the length
+# of the zero run before every non-zero value, and the values themselves
+# (zig-zag signed). Both are Huffman coded; the rare entries >= 255 are
+# escaped into a raw side stream. Everything except the Huffman step runs
+# as whole-array NumPy operations. Planes are coded concurrently; with 4:2:0
+# subsampling the chroma planes are simply stored at their smaller size.
+#
+#   header: magic + version + kind specific fields
+#   plane:  width, height (uint32) + 4 sections (uint32 length + bytes)
+
+VERSION = 1
+DCT_MAGIC = b'DCTC'
+DWT_MAGIC = b'DWTC'
+ESCAPE = 255
+
+SECTION = struct.Struct('>I')
+PLANE = struct.Struct('>II')
+DCT_HEADER = struct.Struct('>4sBBB')      # magic, version, planes, quality
+DWT_HEADER = struct.Struct('>4sBBBB')     # magic, version, planes, quality, level
+
+# JPEG (Annex K) base quantization tables
+LUMA_TABLE = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+], dtype=np.float32).reshape(8, 8)
+
+CHROMA_TABLE = np.array([
+    17, 18, 24, 47, 99, 99, 99, 99,
+    18, 21, 26, 66, 99, 99, 99, 99,
+    24, 26, 56, 99, 99, 99, 99, 99,
+    47, 66, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+], dtype=np.float32).reshape(8, 8)
+
+
+def _zigzag_order(n=8):
+    """Flat indices of an n x n block in zig-zag scan order"""
+    cells = sorted(
+        ((i, j) for i in range(n) for j in range(n)),
+        key=lambda c: (c[0] + c[1], c[1] if (c[0] + c[1]) % 2 == 0 else c[0])
+    )
+    return np.array([i * n + j for i, j in cells])
+
+
+ZIGZAG = _zigzag_order()
+UNZIGZAG = np.argsort(ZIGZAG)
+
+
+def quant_table(quality, chroma=False):
+    """JPEG-style quality scaling of the base table"""
+    quality = min(max(int(quality), 1), 100)
+    scale = 5000 / quality if quality < 50 else 200 - 2 * quality
+    base = CHROMA_TABLE if chroma else LUMA_TABLE
+    return np.clip(np.floor((base * scale + 50) / 100), 1, 255).astype(np.float32)
+
+
+def dwt_step(quality):
+    """Uniform quantizer step (in 0-255 pixel units) for the DWT codec"""
+    return float(101 - min(max(int(quality), 1), 100))
+
+
+# --- coefficient stream coding ---
+
+def _split_escapes(values):
+    values = values.astype(np.uint32)
+    small = values < ESCAPE
+    head = np.where(small, values, ESCAPE).astype(np.uint8).tobytes()
+    return head, values[~small].astype('>u4').tobytes()
+
+
+def _join_escapes(head, extra):
+    values = np.frombuffer(head, dtype=np.uint8).astype(np.int64)
+    escaped = values == ESCAPE
+    values[escaped] = np.frombuffer(extra, dtype='>u4')
+    return values
+
+
+def encode_coefficients(flat):
+    """Run/value code a flat integer coefficient array into four sections"""
+    flat = np.asarray(flat, dtype=np.int64)
+    positions = np.flatnonzero(flat)
+    runs = np.diff(positions, prepend=-1) - 1
+    values = flat[positions]
+    signed = (values << 1) ^ (values >> 63)       # zig-zag: 0,-1,1,-2 -> 0,1,2,3
+
+    run_head, run_extra = _split_escapes(runs)
+    value_head, value_extra = _split_escapes(signed)
+    return [huffman_encode(run_head), huffman_encode(value_head), run_extra, value_extra]
+
+
+def decode_coefficients(sections, size):
+    """Inverse of encode_coefficients for an array of `size` coefficients"""
+    run_head, value_head, run_extra, value_extra = sections
+    runs = _join_escapes(huffman_decode(run_head), run_extra)
+    signed = _join_escapes(huffman_decode(value_head), value_extra)
+    values = (signed >> 1) ^ -(signed & 1)
+
+    flat = np.zeros(size, dtype=np.int64)
+    flat[np.cumsum(runs + 1) - 1] = values
+    return flat
+
+
+def _write_plane(out, shape, sections):
+    out += PLANE.pack(shape[1], shape[0])
+    for section in sections:
+        out += SECTION.pack(len(section)) + section
+
+
+def _read_plane(blob, pos):
+    width, height = PLANE.unpack_from(blob, pos)
+    pos += PLANE.size
+    sections = []
+    for _ in range(4):
+        (length,) = SECTION.unpack_from(blob, pos)
+        pos += SECTION.size
+        sections.append(bytes(blob[pos:pos + length]))
+        pos += length
+    return (height, width), sections, pos
+
+
+def _read_planes(blob, pos, count):
+    planes = []
+    for _ in range(count):
+        shape, sections, pos = _read_plane(blob, pos)
+        planes.append((shape, sections))
+    return planes
+
+
+# --- DCT container ---
+
+def dctc_encode(img, quality=85, threshold=0, subsample=False):
+    """Encode a PIL image as .dctc bytes
+
+    threshold optionally zeroes DCT coefficients below that magnitude
+    before quantization; subsample stores the chroma planes at 4:2:0.
+    """
+    planes = split_planes(img, subsample)
+
+    def encode(index, plane):
+        blocks, _ = to_blocks(plane - 128.0)
+        coeffs = forward_dct(blocks)
+        if threshold:
+            coeffs = threshold_absolute(coeffs, threshold)
+        table = quant_table(quality, chroma=index > 0)
+        q = np.rint(coeffs / table).astype(np.int64).reshape(-1, 64)[:, ZIGZAG]
+        q[:, 0] = np.diff(q[:, 0], prepend=0)       # DC as differences
+        out = bytearray()
+        _write_plane(out, plane.shape, encode_coefficients(q.reshape(-1)))
+        return out
+
+    out = bytearray(DCT_HEADER.pack(DCT_MAGIC, VERSION, len(planes), quality))
+    for chunk in map_planes(encode, range(len(planes)), planes):
+        out += chunk
+    return bytes(out)
+
+
+def dctc_decode(blob):
+    """Decode .dctc bytes into a PIL image"""
+    magic, version, n_planes, quality = DCT_HEADER.unpack_from(blob)
+    if magic != DCT_MAGIC or version != VERSION:
+        raise ValueError("Not a .dctc stream")
+
+    def decode(index, plane):
+        shape, sections = plane
+        ph = -(-shape[0] // 8) * 8
+        pw = -(-shape[1] // 8) * 8
+        q = decode_coefficients(sections, ph * pw).reshape(-1, 64)
+        q[:, 0] = np.cumsum(q[:, 0])
+        table = quant_table(quality, chroma=index > 0)
+        coeffs = q[:, UNZIGZAG].reshape(-1, 8, 8).astype(np.float32) * table
+        return from_blocks(inverse_dct(coeffs), (ph, pw), shape) + 128.0
+
+    planes = _read_planes(blob, DCT_HEADER.size, n_planes)
+    return merge_planes(map_planes(decode, range(n_planes), planes))
+
+
+# --- DWT container ---
+
+def _dwt_slices(shape, wavelet, level):
+    shapes = pywt.wavedecn_shapes(shape, wavelet, level=level)
+    dummy = [np.zeros(shapes[0])] + [
+        tuple(np.zeros(detail[key]) for key in ('da', 'ad', 'dd')) for detail in shapes[1:]
+    ]
+    array, slices = pywt.coeffs_to_array(dummy)
+    return array.shape, slices
+
+
+def dwtc_encode(img, quality=85, wavelet='haar', level=3, threshold=0, subsample=False):
+    """Encode a PIL image as .dwtc bytes"""
+    planes = split_planes(img, subsample)
+    step = dwt_step(quality)
+
+    def encode(plane):
+        coeffs = pywt.wavedec2(plane, wavelet, level=level)
+        array, _ = pywt.coeffs_to_array(coeffs)
+        if threshold:
+            array = threshold_absolute(array, threshold)
+        q = np.rint(array / step).astype(np.int64)
+        out = bytearray()
+        _write_plane(out, plane.shape, encode_coefficients(q.reshape(-1)))
+        return out
+
+    name = wavelet.encode('ascii')
+    out = bytearray(DWT_HEADER.pack(DWT_MAGIC, VERSION, len(planes), quality, level))
+    out += bytes([len(name)]) + name
+    for chunk in map_planes(encode, planes):
+        out += chunk
+    return bytes(out)
+
+
+def dwtc_decode(blob):
+    """Decode .dwtc bytes into a PIL image"""
+    magic, version, n_planes, quality, level = DWT_HEADER.unpack_from(blob)
+    if magic != DWT_MAGIC or version != VERSION:
+        raise ValueError("Not a .dwtc stream")
+
+    pos = DWT_HEADER.size
+    wavelet = bytes(blob[pos + 1:pos + 1 + blob[pos]]).decode('ascii')
+    pos += 1 + blob[pos]
+    step = dwt_step(quality)
+
+    def decode(plane):
+        shape, sections = plane
+        array_shape, slices = _dwt_slices(shape, wavelet, level)
+        q = decode_coefficients(sections, array_shape[0] * array_shape[1])
+        array = q.reshape(array_shape).astype(np.float32) * step
+        coeffs = pywt.array_to_coeffs(array, slices, output_format='wavedec2')
+        return pywt.waverec2(coeffs, wavelet)[:shape[0], :shape[1]]
+
+    return merge_planes(map_planes(decode, _read_planes(blob, pos, n_planes)))
+
+
+def encode_file(input_path, output_path, quality=85, color=True, **kwargs):
+    """Write input_path as .dctc or .dwtc, chosen by output_path's extension"""
+    with Image.open(os.fspath(input_path)) as img:
+        if not color:
+            img = img.convert('L')
+        if os.fspath(output_path).lower().endswith('.dwtc'):
+            blob = dwtc_encode(img, quality, **kwargs)
+        else:
+            blob = dctc_encode(img, quality, **kwargs)
+    with open(output_path, 'wb') as f:
+        f.write(blob)
+    return len(blob)
+
+
+def decode_file(input_path):
+    """Read a .dctc or .dwtc file back into a PIL image"""
+    with open(input_path, 'rb') as f:
+        blob = f.read()
+    if blob[:4] == DWT_MAGIC:
+        return dwtc_decode(blob)
+    return dctc_decode(blob)
@@ -0,0 +1,78 @@
+from functools import lru_cache
+import numpy as np
+
+# Batched block DCT.
+#
+# An image plane is reshaped into an (N, 8, 8) stack of blocks and the 2D
+# DCT-II of every block is computed at once as C @ B @ C.T with a cached,
+# orthonormal basis matrix C (same scaling as cv2.dct).
+
+BLOCK_SIZE = 8
+
+
+@lru_cache(maxsize=None)
+def dct_matrix(n=BLOCK_SIZE):
+    """Orthonormal DCT-II basis; row k holds frequency k"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    basis = np.cos((2 * i + 1) * k * np.pi / (2 * n)) * np.sqrt(2.0 / n)
+    basis[0] /= np.sqrt(2.0)
+    basis = basis.astype(np.float32)
+    basis.setflags(write=False)
+    return basis
+
+
+def to_blocks(plane, n=BLOCK_SIZE):
+    """Split a 2D array into an (N, n, n) block stack (edge padded)"""
+    h, w = plane.shape
+    pad_h = (n - h % n) % n
+    pad_w = (n - w % n) % n
+    if pad_h or pad_w:
+        plane = np.pad(plane, ((0, pad_h), (0, pad_w)), mode='edge')
+    ph, pw = plane.shape
+    blocks = plane.reshape(ph // n, n, pw // n, n).swapaxes(1, 2).reshape(-1, n, n)
+    return blocks, (ph, pw)
+
+
+def from_blocks(blocks, padded_shape, shape):
+    """Inverse of to_blocks, cropped back to the original shape"""
+    ph, pw = padded_shape
+    n = blocks.shape[-1]
+    plane = blocks.reshape(ph // n, pw // n, n, n).swapaxes(1, 2).reshape(ph, pw)
+    return plane[:shape[0], :shape[1]]
+
+
+def _apply(blocks, matrix):
+    """matrix @ B @ matrix.T for every block, as two flat (N*n, n) GEMMs"""
+    n = blocks.shape[-1]
+    rows = (blocks.reshape(-1, n) @ matrix.T).reshape(blocks.shape)
+    return (rows.swapaxes(1, 2).reshape(-1, n) @ matrix.T).reshape(blocks.shape).swapaxes(1, 2)
+
+
+def forward_dct(blocks):
+    """2D DCT of every block in an (N, n, n) stack"""
+    return _apply(blocks, dct_matrix(blocks.shape[-1]))
+
+
+def inverse_dct(coeffs):
+    """Inverse of forward_dct"""
+    return _apply(coeffs, dct_matrix(coeffs.shape[-1]).T)
+
+
+def threshold_relative(coeffs, ratio):
+    """Zero coefficients below ratio * (largest magnitude in their block)"""
+    magnitude = np.abs(coeffs)
+    limit = ratio * magnitude.max(axis=(1, 2), keepdims=True)
+    return coeffs * (magnitude >= limit)
+
+
+def threshold_absolute(coeffs, threshold):
+    """Zero coefficients whose magnitude is below threshold"""
+    return coeffs * (np.abs(coeffs) >= threshold)
+
+
+def compress_plane(plane, quality=85):
+    """DCT, per-block thresholding and inverse DCT of one float plane"""
+    blocks, padded_shape = to_blocks(np.asarray(plane, dtype=np.float32))
+    coeffs = threshold_relative(forward_dct(blocks), (100 - quality) / 100.0)
+    return from_blocks(inverse_dct(coeffs), padded_shape, plane.shape)
@@ -0,0 +1,178 @@
+import os
+import tempfile
+import threading
+import numpy as np
+import pywt
+from PIL import Image
+
+# Tiled wavelet thresholding for images too large to transform in one piece.
+#
+# The plane is cut into TILE_SIZE x TILE_SIZE tiles. Every tile is read with
+# a margin of neighbouring pixels, decomposed, soft-thresholded and
+# reconstructed on its own; only the centre is kept, so the seams land in
+# the discarded margin. Tiles and margins start on multiples of 2**level,
+# which keeps the subsampling phase of every tile equal to that of the full
+# image, and at the image border no margin is read, so pywt's own boundary
+# extension applies exactly as it would to the whole plane.
+#
+# Sources are 2D uint8 arrays: .npy files and raw files (given a shape) are
+# memory-mapped and only the current tile is ever read. Other formats go
+# through PIL, which decodes the whole image: JPEG straight to grayscale
+# (one byte per pixel), anything else at its own pixel size plus one byte
+# for the grayscale copy. That decode is capped at MAX_DECODE_BYTES instead
+# of PIL's decompression bomb limit, which is only lifted while the file is
+# opened and restored right after.
+# Reconstructed tiles are written straight into the output (a memmap for
+# .npy/.raw), so float32 work memory is bounded by the tile size.
+
+TILE_SIZE = 1024
+# Above this many pixels dwt_compress switches to the tiled path
+LARGE_IMAGE_PIXELS = 4096 * 4096
+# Most memory a PIL-decoded source may take; larger ones must be .npy or raw
+MAX_DECODE_BYTES = 1024 ** 3
+RAW_EXTENSIONS = ('.raw', '.gray')
+
+# Serializes the temporary change of Image.MAX_IMAGE_PIXELS in open_unchecked
+_bomb_check_lock = threading.Lock()
+
+
+def tile_margin(wavelet, level):
+    """Margin around a tile that covers the support of every used coefficient"""
+    align = 2 ** level
+    margin = (pywt.Wavelet(wavelet).dec_len - 1) * align
+    return -(-margin // align) * align
+
+
+def iter_tiles(shape, tile_size, margin):
+    """Yield (out_box, read_box) as (y0, y1, x0, x1) for every tile"""
+    height, width = shape
+    for y0 in range(0, height, tile_size):
+        y1 = min(y0 + tile_size, height)
+        for x0 in range(0, width, tile_size):
+            x1 = min(x0 + tile_size, width)
+            yield ((y0, y1, x0, x1),
+                   (max(y0 - margin, 0), min(y1 + margin, height),
+                    max(x0 - margin, 0), min(x1 + margin, width)))
+
+
+def threshold_plane(plane, threshold, wavelet='haar', level=3):
+    """Soft-threshold the detail coefficients of a float plane"""
+    coeffs = pywt.wavedec2(plane, wavelet, level=level)
+    coeffs = [coeffs[0]] + [
+        tuple(pywt.threshold(c, threshold, mode='soft') for c in detail)
+        for detail in coeffs[1:]
+    ]
+    return pywt.waverec2(coeffs, wavelet)[:plane.shape[0], :plane.shape[1]]
+
+
+def tiled_threshold(source, sink, threshold, wavelet='haar', level=3, tile_size=TILE_SIZE):
+    """Run threshold_plane tile by tile from source into sink
+
+    source and sink are 2D uint8 array-likes of the same shape (arrays,
+    memmaps); threshold is in pixel units (0-255). Returns the tile count.
+    """
+    align = 2 ** level
+    tile_size = max(align, tile_size // align * align)
+    margin = tile_margin(wavelet, level)
+    count = 0
+    for (y0, y1, x0, x1), (ry0, ry1, rx0, rx1) in iter_tiles(source.shape, tile_size, margin):
+        window = np.asarray(source[ry0:ry1, rx0:rx1], dtype=np.float32)
+        out = threshold_plane(window, threshold, wavelet, level)
+        out = out[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0]
+        sink[y0:y1, x0:x1] = np.clip(np.rint(out), 0, 255).astype(np.uint8)
+        count += 1
+    return count
+
+
+def open_unchecked(path):
+    """Image.open without PIL's decompression bomb check (nothing is decoded)
+
+    Image.MAX_IMAGE_PIXELS is lifted only while the header is read, under a
+    lock so concurrent calls restore it correctly; the caller applies its
+    own limit (decode_bytes against MAX_DECODE_BYTES).
+    """
+    with _bomb_check_lock:
+        limit = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None
+        try:
+            return Image.open(path)
+        finally:
+            Image.MAX_IMAGE_PIXELS = limit
+
+
+def decode_bytes(img):
+    """Memory open_plane needs to decode img into a grayscale plane"""
+    pixels = img.width * img.height
+    if img.mode == 'L' or (img.format == 'JPEG' and img.mode in ('RGB', 'YCbCr')):
+        return pixels      # decoded (JPEG drafted) straight to 'L'
+    if img.mode in ('1', 'P'):
+        return 2 * pixels  # one byte per pixel, plus the 'L' copy
+    return 5 * pixels      # four bytes per pixel in PIL, plus the 'L' copy
+
+
+def open_plane(path, shape=None):
+    """Grayscale uint8 plane of an image file, memory-mapped where possible
+
+    shape (height, width) marks path as headerless 8-bit raw data. Other
+    formats than .npy/raw are decoded by PIL; ValueError if that would take
+    more than MAX_DECODE_BYTES.
+    """
+    if shape is not None:
+        return np.memmap(path, dtype=np.uint8, mode='r', shape=tuple(shape))
+    if path.lower().endswith('.npy'):
+        plane = np.load(path, mmap_mode='r')
+        if plane.ndim != 2 or plane.dtype != np.uint8:
+            raise ValueError("Expected a 2D uint8 array")
+        return plane
+    with open_unchecked(path) as img:
+        needed = decode_bytes(img)
+        if needed > MAX_DECODE_BYTES:
+            raise ValueError(f"Decoding {img.width}x{img.height} {img.format} ({img.mode}) needs "
+                             f"{needed / 1024 ** 2:.0f} MB, over MAX_DECODE_BYTES; "
+                             f"convert it to a .npy or raw 8-bit file first")
+        if img.format == 'JPEG':
+            img.draft('L', img.size)
+        return np.asarray(img.convert('L'))
+
+
+def image_pixels(path, shape=None):
+    """Pixel count of an image file without decoding it"""
+    if shape is not None:
+        return shape[0] * shape[1]
+    if path.lower().endswith('.npy'):
+        return int(np.prod(np.load(path, mmap_mode='r').shape))
+    with open_unchecked(path) as img:
+        return img.width * img.height
+
+
+def tiled_threshold_file(input_path, output_path, threshold, wavelet='haar', level=3,
+                         tile_size=TILE_SIZE, shape=None):
+    """tiled_threshold from file to file; returns the output plane's shape
+
+    .npy and raw outputs are written tile by tile through a memmap. Other
+    formats are assembled in a temporary memmap and handed to PIL at the
+    end, which needs one byte per pixel.
+    """
+    source = open_plane(input_path, shape)
+    lower = output_path.lower()
+    if lower.endswith('.npy'):
+        sink = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.uint8, shape=source.shape)
+        tiled_threshold(source, sink, threshold, wavelet, level, tile_size)
+        sink.flush()
+        return source.shape
+    if lower.endswith(RAW_EXTENSIONS):
+        sink = np.memmap(output_path, dtype=np.uint8, mode='w+', shape=source.shape)
+        tiled_threshold(source, sink, threshold, wavelet, level, tile_size)
+        sink.flush()
+        return source.shape
+
+    fd, scratch = tempfile.mkstemp(suffix='.raw', dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    try:
+        sink = np.memmap(scratch, dtype=np.uint8, mode='w+', shape=source.shape)
+        tiled_threshold(source, sink, threshold, wavelet, level, tile_size)
+        Image.fromarray(np.asarray(sink)).save(output_path)
+        del sink
+    finally:
+        os.remove(scratch)
+    return source.shape
@@ -0,0 +1,338 @@
+import heapq
+import struct
+import numpy as np
+
+# Canonical Huffman coding over bytes.
+#
+# Codes are length-limited to MAX_BITS so the decoder can use a flat lookup
+# table of 2**MAX_BITS entries, and the code lengths fit in one nibble each.
+# The encoder packs codes straight into bytes with NumPy instead of building
+# a '0'/'1' string, and works chunk by chunk so memory stays bounded.
+
+MAX_BITS = 15
+CHUNK_SIZE = 1 << 16
+# The decoder runs one lane per LANE_BITS of input, DECODE_CHUNK_BITS at a time
+LANE_BITS = 1024
+DECODE_CHUNK_BITS = 1 << 22
+# Steps of each lane searched first when chains are synchronized; no second code
+SYNC_STEPS = 8
+NO_CODE = 1 << 30
+
+# Container: number of symbols (uint64) + 256 code lengths packed as nibbles
+HEADER = struct.Struct('>Q')
+LENGTHS_SIZE = 128
+
+
+def code_lengths(freqs, max_bits=MAX_BITS):
+    """Compute Huffman code lengths (0 = unused) for a 256-entry frequency table"""
+    freqs = np.asarray(freqs, dtype=np.int64)
+    lengths = np.zeros(256, dtype=np.uint8)
+    used = np.nonzero(freqs)[0]
+
+    if len(used) == 0:
+        return lengths
+    if len(used) == 1:
+        lengths[used[0]] = 1
+        return lengths
+
+    weights = freqs.copy()
+    while True:
+        # Heap entries: (weight, tie-breaker, symbols in subtree)
+        heap = [(int(weights[s]), int(s), [int(s)]) for s in used]
+        heapq.heapify(heap)
+        depth = np.zeros(256, dtype=np.int64)
+        while len(heap) > 1:
+            w1, t1, s1 = heapq.heappop(heap)
+            w2, t2, s2 = heapq.heappop(heap)
+            merged = s1 + s2
+            depth[merged] += 1
+            heapq.heappush(heap, (w1 + w2, min(t1, t2), merged))
+
+        if depth.max() <= max_bits:
+            lengths[used] = depth[used]
+            return lengths
+
+        # Too deep: flatten the distribution and try again
+        weights = (weights >> 1) | (weights > 0)
+
+
+def canonical_codes(lengths):
+    """Assign canonical code values for the given code lengths"""
+    codes = np.zeros(256, dtype=np.uint32)
+    code = 0
+    prev_len = 0
+    for length, symbol in sorted((int(l), s) for s, l in enumerate(lengths) if l):
+        code <<= length - prev_len
+        codes[symbol] = code
+        code += 1
+        prev_len = length
+    return codes
+
+
+def codes_as_strings(lengths):
+    """Return {symbol: '0101...'} for display purposes"""
+    codes = canonical_codes(lengths)
+    return {
+        s: format(int(codes[s]), f'0{int(lengths[s])}b')
+        for s in range(256) if lengths[s]
+    }
+
+
+def _as_array(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def _pack_lengths(lengths):
+    return (lengths[0::2] << 4 | lengths[1::2]).astype(np.uint8).tobytes()
+
+
+def _unpack_lengths(raw):
+    packed = np.frombuffer(raw, dtype=np.uint8)
+    lengths = np.empty(256, dtype=np.uint8)
+    lengths[0::2] = packed >> 4
+    lengths[1::2] = packed & 0x0F
+    return lengths
+
+
+class HuffmanEncoder:
+    """Bit-packing encoder for a fixed set of canonical code lengths"""
+
+    def __init__(self, lengths):
+        self.lengths = np.asarray(lengths, dtype=np.uint8)
+        self.codes = canonical_codes(self.lengths)
+        self._len = self.lengths.astype(np.int64)
+        self._code = self.codes.astype(np.int64)
+
+        # Trailing bits of the last partial byte, MSB aligned
+        self._pending = 0
+        self._pending_bits = 0
+
+    def encode(self, data):
+        """Encode bytes and return every complete output byte so far"""
+        symbols = _as_array(data)
+        out = []
+        for start in range(0, len(symbols), CHUNK_SIZE):
+            chunk = symbols[start:start + CHUNK_SIZE]
+            lens = self._len[chunk]
+            ends = np.cumsum(lens) + self._pending_bits
+            pos = ends - lens
+            total_bits = int(ends[-1]) if len(ends) else self._pending_bits
+
+            # Each code (<= 15 bits) at bit offset <= 7 fits in a 32-bit
+            # window starting at its first byte. Codes never share bits, so
+            # summing the four byte lanes is the same as OR-ing them.
+            word = self._code[chunk] << (32 - lens - (pos & 7))
+            first = pos >> 3
+            size = (total_bits + 7) // 8 + 3
+            buf = np.zeros(size)
+            for lane, shift in enumerate((24, 16, 8, 0)):
+                buf[lane:] += np.bincount(first, weights=word >> shift & 0xFF,
+                                          minlength=size - lane)
+            buf[0] += self._pending
+            buf = buf.astype(np.uint8)
+
+            whole = total_bits // 8
+            out.append(buf[:whole].tobytes())
+            self._pending = int(buf[whole])
+            self._pending_bits = total_bits % 8
+        return b''.join(out)
+
+    def flush(self):
+        """Emit the final partial byte, zero padded"""
+        tail = bytes([self._pending]) if self._pending_bits else b''
+        self._pending = 0
+        self._pending_bits = 0
+        return tail
+
+
+class HuffmanDecoder:
+    """Lookup-table decoder for canonical codes, decoding many codes per step
+
+    The bit stream is cut into LANE_BITS segments that are decoded in
+    lockstep: each step maps the MAX_BITS window at every lane's position
+    through a 2**MAX_BITS table to the code starting there and, if it fits
+    in the same window, the code after it. Every lane starts at the first
+    bit of its segment, which only for the first lane is known to be a code
+    boundary. Huffman codes resynchronize within a few symbols, so the true
+    chain of codes entering a segment (from where the previous lane left it)
+    is followed code by code until it lands on a code start the lane found
+    as well; from there on the lane's codes are the true ones, and the ones
+    before are replaced by the followed chain.
+    """
+
+    def __init__(self, lengths):
+        self.lengths = np.asarray(lengths, dtype=np.uint8)
+        codes = canonical_codes(self.lengths)
+        used = np.nonzero(self.lengths)[0]
+
+        self._symbol = np.zeros(1 << MAX_BITS, dtype=np.uint8)
+        self._length = np.zeros(1 << MAX_BITS, dtype=np.int32)
+        for s in used:
+            span = MAX_BITS - int(self.lengths[s])
+            first = int(codes[s]) << span
+            self._symbol[first:first + (1 << span)] = s
+            self._length[first:first + (1 << span)] = self.lengths[s]
+        # A one-symbol code is a single 0 bit per symbol; any other code
+        # written by code_lengths is complete (Kraft sum exactly 1), so every
+        # window decodes to one code
+        self._single = int(used[0]) if len(used) == 1 else None
+        kraft = sum(1 << (MAX_BITS - int(self.lengths[s])) for s in used)
+        self._complete = kraft == 1 << MAX_BITS
+
+        # Pair table: both symbols of a window as two bytes of one uint16, the
+        # offset of the second code (NO_CODE if it does not fit) and the advance
+        window = np.arange(1 << MAX_BITS)
+        rest = (window << self._length) & ((1 << MAX_BITS) - 1)
+        pair = self._length + self._length[rest] <= MAX_BITS
+        self._pair = np.stack((self._symbol, self._symbol[rest]), axis=1).view(np.uint16).ravel()
+        self._second_at = np.where(pair, self._length, NO_CODE).astype(np.int32)
+        self._advance = np.where(pair, self._length + self._length[rest], self._length).astype(np.int32)
+
+    @staticmethod
+    def _window(words, p):
+        """Table index of the MAX_BITS bits starting at bit positions p"""
+        return (words[p >> 3] >> (32 - MAX_BITS - (p & 7))) & ((1 << MAX_BITS) - 1)
+
+    def _decode_span(self, data, begin, end):
+        """Symbols of the codes starting in [begin, end), given that one starts at begin
+
+        Returns (symbols, position of the first code starting at or after end).
+        """
+        first = begin >> 3
+        s0 = begin - first * 8
+        n = end - begin
+        # Codes run past end by less than MAX_BITS bits; zeros beyond the data.
+        # words[i] is the big-endian 32-bit word at byte i (a strided view).
+        size = ((s0 + n + MAX_BITS) >> 3) + 1
+        raw = np.zeros(size + 3, dtype=np.uint8)
+        chunk = data[first:first + size]
+        raw[:len(chunk)] = chunk
+        words = np.ndarray((size,), dtype='>u4', buffer=raw, strides=(1,))
+
+        lane_start = np.arange(s0, s0 + n, LANE_BITS, dtype=np.int32)
+        lane_end = np.minimum(lane_start + LANE_BITS, s0 + n).astype(np.int32)
+        lanes = len(lane_start)
+
+        # Speculative decode of every segment, one row per step; finished
+        # lanes stay at their first code start past the segment
+        starts, seconds, pairs = [], [], []
+        p = lane_start
+        while True:
+            active = p < lane_end
+            if not active.any():
+                break
+            index = self._window(words, p)
+            starts.append(p)
+            seconds.append(p + self._second_at[index])
+            pairs.append(self._pair[index])
+            p = p + self._advance[index] * active
+        starts, seconds = np.stack(starts), np.stack(seconds)
+        last = seconds[(starts < lane_end).sum(axis=0) - 1, np.arange(lanes)]
+        spec_exit = np.where(last >= lane_end, np.minimum(p, last), p)
+
+        # Follow the true chain into every segment until it meets the lane's
+        # codes. A lane it never meets ends where the chain leaves it, and the
+        # next lane has to be followed again from there.
+        head = min(SYNC_STEPS, len(starts))
+        exits = spec_exit.copy()
+        sync = lane_start.copy()      # the lane's own codes are right from here
+        walk_round = np.zeros(lanes, dtype=np.int64)
+        fixups = []
+        todo = np.arange(1, lanes)
+        round_ = 0
+        while len(todo):
+            round_ += 1
+            walk_round[todo] = round_
+            previous = exits[todo]
+            lane, e = todo, exits[todo - 1]
+            while len(lane):
+                limit = lane_end[lane]
+                out = e >= limit
+                sync[lane[out]] = limit[out]
+                exits[lane[out]] = e[out]
+                lane, e = lane[~out], e[~out]
+
+                firsts, second = starts[:head, lane], seconds[:head, lane]
+                met = ((firsts == e) | (second == e)).any(axis=0)
+                far = e > firsts[-1]
+                if far.any():
+                    wide = lane[far]
+                    met[far] = ((starts[:, wide] == e[far]) | (seconds[:, wide] == e[far])).any(axis=0)
+                sync[lane[met]] = e[met]
+                exits[lane[met]] = spec_exit[lane[met]]
+                lane, e = lane[~met], e[~met]
+                if len(lane):
+                    index = self._window(words, e)
+                    fixups.append((round_, lane, e, self._symbol[index]))
+                    e = e + self._length[index]
+            changed = todo[exits[todo] != previous]
+            todo = changed[changed + 1 < lanes] + 1
+
+        # Keep the codes from each lane's sync point to its end, in lane order
+        keep = np.stack(((starts >= sync) & (starts < lane_end),
+                         (seconds >= sync) & (seconds < lane_end)), axis=2)
+        keep = np.ascontiguousarray(keep.view(np.uint16)[..., 0].T).view(bool).ravel()
+        symbols = np.ascontiguousarray(np.stack(pairs).T).view(np.uint8).ravel()[keep]
+        if fixups:
+            # The followed chain goes in front of the lane's own codes
+            rounds = np.concatenate([np.full(len(q), r) for r, _, q, _ in fixups])
+            lane, q, sym = (np.concatenate(part) for part in list(zip(*fixups))[1:])
+            current = np.flatnonzero(walk_round[lane] == rounds)
+            current = current[np.argsort(q[current], kind='stable')]
+            kept = keep.reshape(lanes, -1).sum(axis=1)
+            offsets = np.cumsum(kept) - kept
+            symbols = np.insert(symbols, offsets[lane[current]], sym[current])
+        return symbols, first * 8 + int(exits[-1])
+
+    def decode(self, payload, count):
+        """Decode `count` symbols from a packed bit stream"""
+        if count == 0:
+            return b''
+        total_bits = len(payload) * 8
+        if self._single is not None:
+            if total_bits < count:
+                raise ValueError("Truncated Huffman stream")
+            return bytes([self._single]) * count
+        if not self._complete:
+            raise ValueError("Invalid Huffman code lengths")
+
+        data = np.frombuffer(payload, dtype=np.uint8)
+        out = []
+        pos = 0
+        remaining = count
+        while remaining and pos < total_bits:
+            symbols, pos = self._decode_span(data, pos, min(pos + DECODE_CHUNK_BITS, total_bits))
+            symbols = symbols[:remaining]
+            out.append(symbols.tobytes())
+            remaining -= len(symbols)
+
+        if remaining:
+            raise ValueError("Truncated Huffman stream")
+        return b''.join(out)
+
+
+def huffman_encode(data):
+    """Compress bytes (or str as UTF-8) into a self-describing Huffman blob"""
+    symbols = _as_array(data)
+    lengths = code_lengths(np.bincount(symbols, minlength=256))
+    encoder = HuffmanEncoder(lengths)
+    payload = encoder.encode(symbols) + encoder.flush()
+    return HEADER.pack(len(symbols)) + _pack_lengths(lengths) + payload
+
+
+def read_code_lengths(blob):
+    """Return the code length table stored in a huffman_encode blob"""
+    return _unpack_lengths(blob[HEADER.size:HEADER.size + LENGTHS_SIZE])
+
+
+def huffman_decode(blob):
+    """Inverse of huffman_encode; ValueError for a truncated or corrupt blob"""
+    if len(blob) < HEADER.size + LENGTHS_SIZE:
+        raise ValueError("Truncated Huffman blob")
+    (count,) = HEADER.unpack_from(blob)
+    lengths = read_code_lengths(blob)
+    offset = HEADER.size
+    payload = blob[offset + LENGTHS_SIZE:]
+    return HuffmanDecoder(lengths).decode(payload, count)
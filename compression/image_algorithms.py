@@ -1,55 +1,102 @@
 from PIL import Image, ImageOps
 import os
+from .image_io import as_file, is_path, save_image, write_bytes
+from .rate_control import search_quality
 
 class ImageCompression:
+    """File-format image codecs
+
+    Inputs are paths, bytes or readable file objects. Outputs are paths or
+    writable file objects; without output_path a path input gets a derived
+    file name next to it, while in-memory input returns the encoded bytes.
+    """
+
     def __init__(self):
-        pass
+        # Report of the last target_bytes / target_ssim search
+        self.last_search = None
+    
+    @staticmethod
+    def _default_output(input_path, suffix):
+        if not is_path(input_path):
+            return None
+        name, ext = os.path.splitext(input_path)
+        return f"{name}{suffix}"
+    
+    def compress_to_target(self, input_path, fmt='jpeg', target_bytes=None, target_ssim=None,
+                           output_path=None):
+        """Pick the quality that meets target_bytes and/or target_ssim
+
+        The image is decoded once and probed with in-memory encodes; the
+        result (quality, size, encodes, ...) is kept in self.last_search.
+        """
+        with Image.open(as_file(input_path)) as img:
+            img.load()
+            result = search_quality(img, fmt, target_bytes, target_ssim)
+        
+        if output_path is None:
+            output_path = self._default_output(
+                input_path, f"_compressed_q{result['quality']}.{'jpg' if fmt == 'jpeg' else fmt}")
+        output = write_bytes(result.pop('data'), output_path)
+        
+        result['output_path'] = output_path
+        self.last_search = result
+        return output
     
-    def jpeg_compress(self, input_path, quality=85):
-        """JPEG Compression - Lossy"""
+    def jpeg_compress(self, input_path, quality=85, output_path=None, target_bytes=None, target_ssim=None):
+        """JPEG Compression - Lossy
+
+        target_bytes / target_ssim search the quality instead of using it.
+        """
+        if target_bytes is not None or target_ssim is not None:
+            try:
+                return self.compress_to_target(input_path, 'jpeg', target_bytes, target_ssim, output_path)
+            except Exception as e:
+                raise Exception(f"JPEG compression failed: {str(e)}")
         try:
-            with Image.open(input_path) as img:
+            with Image.open(as_file(input_path)) as img:
                 # Convert to RGB if necessary
                 if img.mode in ('RGBA', 'LA', 'P'):
                     img = img.convert('RGB')
                 
                 # Generate output filename
-                name, ext = os.path.splitext(input_path)
-                output_path = f"{name}_compressed_q{quality}.jpg"
+                if output_path is None:
+                    output_path = self._default_output(input_path, f"_compressed_q{quality}.jpg")
                 
                 # Save with specified quality
-                img.save(output_path, 'JPEG', quality=quality, optimize=True)
-                
-                return output_path
+                return save_image(img, output_path, 'JPEG', quality=quality, optimize=True)
         except Exception as e:
             raise Exception(f"JPEG compression failed: {str(e)}")
     
-    def png_compress(self, input_path):
+    def png_compress(self, input_path, output_path=None):
         """PNG Compression - Lossless"""
         try:
-            with Image.open(input_path) as img:
+            with Image.open(as_file(input_path)) as img:
                 # Generate output filename
-                name, ext = os.path.splitext(input_path)
-                output_path = f"{name}_compressed.png"
+                if output_path is None:
+                    output_path = self._default_output(input_path, "_compressed.png")
                 
                 # Save with PNG compression
-                img.save(output_path, 'PNG', optimize=True)
-                
-                return output_path
+                return save_image(img, output_path, 'PNG', optimize=True)
         except Exception as e:
             raise Exception(f"PNG compression failed: {str(e)}")
     
-    def webp_compress(self, input_path, quality=85):
-        """WebP Compression - Lossy/Lossless"""
+    def webp_compress(self, input_path, quality=85, output_path=None, target_bytes=None, target_ssim=None):
+        """WebP Compression - Lossy/Lossless
+
+        target_bytes / target_ssim search the quality instead of using it.
+        """
+        if target_bytes is not None or target_ssim is not None:
+            try:
+                return self.compress_to_target(input_path, 'webp', target_bytes, target_ssim, output_path)
+            except Exception as e:
+                raise Exception(f"WebP compression failed: {str(e)}")
         try:
-            with Image.open(input_path) as img:
+            with Image.open(as_file(input_path)) as img:
                 # Generate output filename
-                name, ext = os.path.splitext(input_path)
-                output_path = f"{name}_compressed.webp"
+                if output_path is None:
+                    output_path = self._default_output(input_path, "_compressed.webp")
                 
                 # Save as WebP
-                img.save(output_path, 'WEBP', quality=quality, optimize=True)
-                
-                return output_path
+                return save_image(img, output_path, 'WEBP', quality=quality, optimize=True)
         except Exception as e:
             raise Exception(f"WebP compression failed: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,87 @@
+import io
+import os
+from PIL import Image
+
+# Path-or-buffer image I/O for the image codecs.
+#
+# A source is a file path, bytes-like data (bytes, bytearray, memoryview),
+# a readable binary file object (BytesIO, an upload stream) or an already
+# decoded PIL image (open_image only). An output
+# is a path, a writable binary file object, or None for "return the encoded
+# bytes". Nothing here touches the disk unless it was given a path.
+
+DEFAULT_FORMAT = 'PNG'
+
+
+def is_path(obj):
+    return isinstance(obj, (str, os.PathLike))
+
+
+def as_file(source):
+    """A file path or readable file object for source"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def open_image(source):
+    """Decode source into a loaded PIL image (the source can be closed after)"""
+    if isinstance(source, Image.Image):
+        return source
+    with Image.open(as_file(source)) as img:
+        img.load()
+        return img
+
+
+def source_size(source):
+    """Size in bytes of a path, bytes-like or seekable file object"""
+    if is_path(source):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    position = source.tell()
+    size = source.seek(0, io.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def output_format(output, format=None):
+    """PIL format name for output: explicit, else from the path, else PNG"""
+    if format:
+        return format.upper()
+    if is_path(output):
+        extension = os.path.splitext(os.fspath(output))[1].lower()
+        return Image.registered_extensions().get(extension, DEFAULT_FORMAT)
+    return DEFAULT_FORMAT
+
+
+def save_image(img, output=None, format=None, **options):
+    """Encode img into output (path or file object) or, for None, return bytes"""
+    target = io.BytesIO() if output is None else output
+    img.save(target, output_format(output, format), **options)
+    if output is None:
+        return target.getvalue()
+    return output
+
+
+def write_bytes(data, output=None):
+    """Like save_image for already encoded data"""
+    if output is None:
+        return bytes(data)
+    if is_path(output):
+        with open(output, 'wb') as f:
+            f.write(data)
+    else:
+        output.write(data)
+    return output
+
+
+def output_size(output, result):
+    """Bytes written: the encoded length for in-memory results, else the file size"""
+    if output is None:
+        return len(result)
+    if is_path(output):
+        return os.path.getsize(output)
+    return output.tell()
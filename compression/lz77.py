@@ -0,0 +1,242 @@
+from array import array
+
+# LZ77 with a hash-chain match finder and lazy matching.
+#
+# Stream layout: one header byte (log2 of the window size), then groups of up
+# to eight tokens, each group preceded by a flag byte (bit i set = token i is
+# a match). A literal is one raw byte; a match is varint(length - MIN_MATCH)
+# followed by varint(offset - 1).
+
+MIN_MATCH = 3
+MAX_MATCH = 1 << 12
+MIN_WINDOW_BITS = 10
+MAX_WINDOW_BITS = 20
+DEFAULT_WINDOW = 1 << 15
+
+
+def _window_bits(window_size):
+    bits = max(MIN_WINDOW_BITS, (window_size - 1).bit_length())
+    if bits > MAX_WINDOW_BITS:
+        raise ValueError(f"Window size must be at most {1 << MAX_WINDOW_BITS} bytes")
+    return bits
+
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _match_length(data, a, b, limit):
+    """Length of the common prefix of data[a:] and data[b:], up to limit"""
+    length = 0
+    # Compare in slices first, then finish byte by byte
+    while length + 32 <= limit and data[a + length:a + length + 32] == data[b + length:b + length + 32]:
+        length += 32
+    while length < limit and data[a + length] == data[b + length]:
+        length += 1
+    return length
+
+
+class LZ77Compressor:
+    """Hash-chain LZ77 match finder
+
+    window_size: how far back matches may reach (1 KB - 1 MB)
+    max_chain:   candidates examined per position (speed/ratio trade-off)
+    lazy:        defer a match by one byte when the next position matches longer
+    """
+
+    def __init__(self, window_size=DEFAULT_WINDOW, max_chain=64, lazy=True):
+        self.window_bits = _window_bits(window_size)
+        self.window_size = 1 << self.window_bits
+        self.max_chain = max_chain
+        self.lazy = lazy
+
+    def _find(self, data, i, head, prev, mask):
+        """Best (length, offset) at position i, or (0, 0)"""
+        end = len(data)
+        if i + MIN_MATCH > end:
+            return 0, 0
+
+        limit = min(MAX_MATCH, end - i)
+        cand = head.get(data[i:i + MIN_MATCH], -1)
+        best_len = 0
+        best_off = 0
+        chain = self.max_chain
+        lowest = i - self.window_size
+        while cand > lowest and cand >= 0 and chain:
+            # Cheap rejection: the byte that would extend the best match
+            if data[cand + best_len] == data[i + best_len]:
+                length = _match_length(data, cand, i, limit)
+                if length > best_len:
+                    best_len = length
+                    best_off = i - cand
+                    if length == limit:
+                        break
+            nxt = prev[cand & mask]
+            if nxt >= cand:
+                break
+            cand = nxt
+            chain -= 1
+
+        if best_len < MIN_MATCH:
+            return 0, 0
+        return best_len, best_off
+
+    def compress(self, data):
+        """Compress bytes (or str as UTF-8) into a token stream"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        data = bytes(data)
+
+        out = bytearray([self.window_bits])
+        mask = self.window_size - 1
+        head = {}
+        prev = array('l', [-1]) * self.window_size
+
+        def insert(pos):
+            key = data[pos:pos + MIN_MATCH]
+            prev[pos & mask] = head.get(key, -1)
+            head[key] = pos
+
+        flag_pos = 0
+        flag_bit = 8
+        end = len(data)
+        i = 0
+        pending = None
+        while i < end:
+            if flag_bit == 8:
+                flag_pos = len(out)
+                out.append(0)
+                flag_bit = 0
+
+            length, offset = pending if pending else self._find(data, i, head, prev, mask)
+            pending = None
+
+            if length and self.lazy and length < MAX_MATCH and i + 1 < end:
+                if i + MIN_MATCH <= end:
+                    insert(i)
+                nxt = self._find(data, i + 1, head, prev, mask)
+                if nxt[0] > length:
+                    # Emit a literal now and take the longer match next step
+                    out.append(data[i])
+                    flag_bit += 1
+                    i += 1
+                    pending = nxt
+                    continue
+                start = i + 1
+            else:
+                start = i
+
+            if length:
+                out[flag_pos] |= 1 << flag_bit
+                _put_varint(out, length - MIN_MATCH)
+                _put_varint(out, offset - 1)
+                stop = min(i + length, end - MIN_MATCH + 1)
+            else:
+                out.append(data[i])
+                length = 1
+                stop = min(i + 1, end - MIN_MATCH + 1)
+
+            for pos in range(start, stop):
+                insert(pos)
+            flag_bit += 1
+            i += length
+
+        return bytes(out)
+
+
+class LZ77Decompressor:
+    """Streaming decoder: feed() compressed chunks, get plain bytes back
+
+    Only the last window_size bytes of output are retained, so memory is
+    bounded by the window no matter how long the stream is.
+    """
+
+    def __init__(self):
+        self.window_size = None
+        self._history = bytearray()
+        self._input = bytearray()
+        self._flags = 0
+        self._flag_bit = 8
+
+    def _read_varint(self, pos):
+        value = 0
+        shift = 0
+        data = self._input
+        while pos < len(data):
+            byte = data[pos]
+            value |= (byte & 0x7F) << shift
+            pos += 1
+            if byte < 0x80:
+                return value, pos
+            shift += 7
+        return None, pos
+
+    def feed(self, chunk):
+        self._input += chunk
+        data = self._input
+        pos = 0
+
+        if self.window_size is None:
+            if not data:
+                return b''
+            bits = data[0]
+            if not MIN_WINDOW_BITS <= bits <= MAX_WINDOW_BITS:
+                raise ValueError("Not an LZ77 stream")
+            self.window_size = 1 << bits
+            pos = 1
+
+        history = self._history
+        start = len(history)
+        while pos < len(data):
+            if self._flag_bit == 8:
+                self._flags = data[pos]
+                self._flag_bit = 0
+                pos += 1
+                continue
+
+            if self._flags >> self._flag_bit & 1:
+                length, p = self._read_varint(pos)
+                if length is None:
+                    break
+                offset, p = self._read_varint(p)
+                if offset is None:
+                    break
+                length += MIN_MATCH
+                offset += 1
+                if offset > len(history):
+                    raise ValueError("Match offset beyond start of stream")
+                src = len(history) - offset
+                if offset >= length:
+                    history += history[src:src + length]
+                else:
+                    # Overlapping copy: repeat the period
+                    period = history[src:]
+                    history += (period * (length // offset + 1))[:length]
+                pos = p
+            else:
+                history.append(data[pos])
+                pos += 1
+            self._flag_bit += 1
+
+        del data[:pos]
+        out = bytes(history[start:])
+        if len(history) > self.window_size:
+            del history[:len(history) - self.window_size]
+        return out
+
+    def flush(self):
+        if self._input:
+            raise ValueError("Truncated LZ77 stream")
+        return b''
+
+
+def lz77_compress(data, window_size=DEFAULT_WINDOW, max_chain=64, lazy=True):
+    return LZ77Compressor(window_size, max_chain, lazy).compress(data)
+
+
+def lz77_decompress(blob):
+    decoder = LZ77Decompressor()
+    return decoder.feed(blob) + decoder.flush()
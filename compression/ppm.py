@@ -0,0 +1,517 @@
+import argparse
+import bz2
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+
+# PPM (prediction by partial matching) over bytes with a range coder.
+#
+# Every byte is predicted from the longest context (up to `order` previous
+# bytes) that has seen anything. If the byte is new in that context an
+# escape is coded and the next shorter context is tried, excluding the
+# symbols already ruled out; order -1 is a uniform distribution over the
+# symbols still possible, including an end-of-stream symbol. Escape counts
+# follow method C (number of distinct symbols in the context), with update
+# exclusion: only the contexts from the one that coded the byte up to the
+# longest are counted. Encoder and decoder update the model identically, so
+# nothing but the header is stored besides the coded stream.
+#
+#   header: '>4sBBH' magic, order, memory policy, memory limit in MB
+#   body:   range coder output, terminated by the coded EOF symbol
+
+MAGIC = b'PPMr'
+HEADER = struct.Struct('>4sBBH')
+DEFAULT_ORDER = 4
+MAX_ORDER = 12
+DEFAULT_MEMORY_MB = 64
+EOF = 256
+CHUNK_SIZE = 1 << 20
+MAX_COUNT = 240              # a context is halved when one count passes this
+
+# 32-bit carry-less range coder (Subbotin)
+TOP = 1 << 24
+BOT = 1 << 16
+MASK = 0xFFFFFFFF
+
+
+class RangeEncoder:
+    def __init__(self):
+        self.low = 0
+        self.range = MASK
+        self.out = bytearray()
+
+    def encode(self, cum, freq, total):
+        r = self.range // total
+        self.low += r * cum
+        self.range = r * freq
+        # Emit settled top bytes; force settlement when the range gets small
+        while True:
+            if (self.low ^ (self.low + self.range)) >= TOP:
+                if self.range >= BOT:
+                    return
+                self.range = -self.low & (BOT - 1)
+            self.out.append(self.low >> 24)
+            self.low = (self.low << 8) & MASK
+            self.range = (self.range << 8) & MASK
+
+    def finish(self):
+        for _ in range(4):
+            self.out.append(self.low >> 24)
+            self.low = (self.low << 8) & MASK
+        return bytes(self.out)
+
+
+class RangeDecoder:
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos + 4
+        self.low = 0
+        self.range = MASK
+        self.code = int.from_bytes(bytes(data[pos:pos + 4]).ljust(4, b'\0'), 'big')
+        self._r = 1
+
+    def target(self, total):
+        """Cumulative frequency the next symbol falls into"""
+        self._r = self.range // total
+        return min(total - 1, ((self.code - self.low) & MASK) // self._r)
+
+    def consume(self, cum, freq):
+        r = self._r
+        self.low += r * cum
+        self.range = r * freq
+        data = self.data
+        while True:
+            if (self.low ^ (self.low + self.range)) >= TOP:
+                if self.range >= BOT:
+                    return
+                self.range = -self.low & (BOT - 1)
+            byte = data[self.pos] if self.pos < len(data) else 0
+            self.pos += 1
+            self.code = ((self.code << 8) | byte) & MASK
+            self.low = (self.low << 8) & MASK
+            self.range = (self.range << 8) & MASK
+
+
+POLICIES = {'rescale': 0, 'reset': 1}
+POLICY_NAMES = {code: name for name, code in POLICIES.items()}
+
+
+class ContextTable:
+    """Hashed context statistics with a memory ceiling
+
+    A context of k bytes is keyed by the exact integer 1 << 8k | bytes, and
+    its statistics are one bytearray: the n symbols seen, then their n
+    counts (counts stay below 256, see MAX_COUNT). A context costs about
+    ENTRY_OVERHEAD bytes of object overhead plus two bytes per symbol,
+    well under a dict of dicts, and that is what counts against the limit.
+
+    When the estimated size passes memory_limit the policy applies:
+    'rescale' halves every count and drops what falls to zero (rarely seen
+    contexts disappear, frequent statistics survive), falling back to a
+    reset if that frees too little; 'reset' starts from an empty model.
+    Encoder and decoder hit the limit at the same symbol, so both stay in
+    step.
+    """
+
+    # Dict slot, int key and bytearray header, measured on CPython 3.x
+    ENTRY_OVERHEAD = 160
+
+    def __init__(self, memory_limit, policy='rescale'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        self.memory_limit = memory_limit
+        self.policy = policy
+        self.table = {}
+        self.used = 0
+        self.stats = {'rescales': 0, 'resets': 0, 'peak_contexts': 0}
+
+    def __len__(self):
+        return len(self.table)
+
+    def update(self, keys, symbol):
+        """Count symbol in every context of keys"""
+        table = self.table
+        for key in keys:
+            buf = table.get(key)
+            if buf is None:
+                table[key] = bytearray((symbol, 1))
+                self.used += self.ENTRY_OVERHEAD + 2
+                continue
+            n = len(buf) >> 1
+            i = buf.find(symbol, 0, n)
+            if i < 0:
+                buf.insert(n, symbol)
+                buf.append(1)
+                self.used += 2
+            elif buf[n + i] == MAX_COUNT:
+                buf[n + i] += 1
+                self._halve(key, buf)
+            else:
+                buf[n + i] += 1
+        if self.used > self.memory_limit:
+            self._enforce()
+
+    def _halve(self, key, buf):
+        n = len(buf) >> 1
+        kept = [(s, c >> 1) for s, c in zip(buf[:n], buf[n:]) if c > 1]
+        halved = bytearray(s for s, _ in kept) + bytearray(c for _, c in kept)
+        self.used += len(halved) - len(buf)
+        if halved:
+            self.table[key] = halved
+        else:
+            del self.table[key]
+            self.used -= self.ENTRY_OVERHEAD
+
+    def _enforce(self):
+        self.stats['peak_contexts'] = max(self.stats['peak_contexts'], len(self.table))
+        if self.policy == 'rescale':
+            self.stats['rescales'] += 1
+            for key, buf in list(self.table.items()):
+                self._halve(key, buf)
+            if self.used <= self.memory_limit * 3 // 4:
+                return
+        self.stats['resets'] += 1
+        self.table.clear()
+        self.used = 0
+
+
+class _Model:
+    """State shared by the encoder and decoder loops"""
+
+    def __init__(self, order, memory_limit, policy):
+        if not 0 <= order <= MAX_ORDER:
+            raise ValueError(f"Order must be between 0 and {MAX_ORDER}")
+        self.order = order
+        self.contexts = ContextTable(memory_limit, policy)
+        self.history = 0                      # last `order` bytes as an int
+        self.seen = 0
+        self.history_mask = (1 << (8 * order)) - 1
+        self.masks = [(1 << (8 * k)) - 1 for k in range(order + 1)]
+        self.tops = [1 << (8 * k) for k in range(order + 1)]
+
+    def keys(self):
+        """Context keys for the next byte, longest first"""
+        h = self.history
+        masks, tops = self.masks, self.tops
+        return [(h & masks[k]) | tops[k] for k in range(min(self.order, self.seen), -1, -1)]
+
+    def update(self, keys, symbol):
+        """Count symbol from the context that coded it up to the longest
+        (update exclusion); the shorter ones are left alone"""
+        self.contexts.update(keys, symbol)
+        self.history = ((self.history << 8) | symbol) & self.history_mask
+        self.seen += 1
+
+
+def _header(order, memory_mb, policy):
+    return HEADER.pack(MAGIC, order, POLICIES[policy], memory_mb)
+
+
+class PPMCompressor:
+    """Incremental PPM encoder: feed() chunks, then flush()
+
+    Memory is bounded by memory_mb (the context table) regardless of the
+    input size; only the last `order` bytes of input are remembered.
+    """
+
+    def __init__(self, order=DEFAULT_ORDER, memory_mb=DEFAULT_MEMORY_MB, policy='rescale'):
+        self.model = _Model(order, memory_mb << 20, policy)
+        self.encoder = RangeEncoder()
+        self.encoder.out += _header(order, memory_mb, policy)
+        self._excluded = bytearray(EOF + 1)
+
+    def _encode(self, symbol):
+        model = self.model
+        table = model.contexts.table
+        encoder = self.encoder
+        excluded = self._excluded
+        keys = model.keys()
+        ruled_out = []
+        for depth, key in enumerate(keys):
+            buf = table.get(key)
+            if buf is None:
+                continue
+            n = len(buf) >> 1
+            if not ruled_out:
+                # Nothing excluded yet: totals straight from the count bytes
+                counts = buf[n:]
+                total = sum(counts)
+                i = buf.find(symbol, 0, n) if symbol != EOF else -1
+                if i >= 0:
+                    encoder.encode(sum(counts[:i]), counts[i], total + n)
+                    keys = keys[:depth + 1]
+                    break
+                encoder.encode(total, n, total + n)
+                for s in buf[:n]:
+                    excluded[s] = 1
+                ruled_out.extend(buf[:n])
+                continue
+            total = distinct = low = freq = 0
+            for s, count in zip(buf[:n], buf[n:]):
+                if excluded[s]:
+                    continue
+                if s == symbol:
+                    low = total
+                    freq = count
+                total += count
+                distinct += 1
+            if not distinct:
+                continue
+            if freq:
+                encoder.encode(low, freq, total + distinct)
+                keys = keys[:depth + 1]
+                break
+            # Escape, then rule out everything this context predicted
+            encoder.encode(total, distinct, total + distinct)
+            for s in buf[:n]:
+                if not excluded[s]:
+                    excluded[s] = 1
+                    ruled_out.append(s)
+        else:
+            # Order -1: uniform over the symbols (bytes and EOF) not yet excluded
+            below = sum(1 for s in ruled_out if s < symbol)
+            encoder.encode(symbol - below, 1, EOF + 1 - len(ruled_out))
+        for s in ruled_out:
+            excluded[s] = 0
+        if symbol != EOF:
+            model.update(keys, symbol)
+
+    def feed(self, chunk):
+        encode = self._encode
+        for symbol in chunk:
+            encode(symbol)
+        out = bytes(self.encoder.out)
+        self.encoder.out.clear()
+        return out
+
+    def flush(self):
+        self._encode(EOF)
+        return self.encoder.finish()
+
+
+class PPMDecompressor:
+    """Incremental PPM decoder: feed() compressed chunks, then flush()"""
+
+    def __init__(self):
+        self.model = None
+        self.decoder = None
+        self._input = bytearray()
+        self._excluded = bytearray(EOF + 1)
+        self.finished = False
+
+    def _start(self):
+        magic, order, policy, memory_mb = HEADER.unpack_from(self._input, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a PPM stream")
+        if policy not in POLICY_NAMES:
+            raise ValueError(f"Unknown policy id: {policy}")
+        self.model = _Model(order, memory_mb << 20, POLICY_NAMES[policy])
+        self.decoder = RangeDecoder(self._input, HEADER.size)
+
+    def _decode(self):
+        """Decode one symbol; returns the byte or EOF"""
+        model = self.model
+        table = model.contexts.table
+        decoder = self.decoder
+        excluded = self._excluded
+        keys = model.keys()
+        ruled_out = []
+        symbol = -1
+        for depth, key in enumerate(keys):
+            buf = table.get(key)
+            if buf is None:
+                continue
+            n = len(buf) >> 1
+            candidates = [(s, c) for s, c in zip(buf[:n], buf[n:]) if not excluded[s]]
+            if not candidates:
+                continue
+            total = sum(c for _, c in candidates)
+            distinct = len(candidates)
+            target = decoder.target(total + distinct)
+            if target < total:
+                cum = 0
+                for s, count in candidates:
+                    if target < cum + count:
+                        decoder.consume(cum, count)
+                        symbol = s
+                        break
+                    cum += count
+                keys = keys[:depth + 1]
+                break
+            decoder.consume(total, distinct)
+            for s, _ in candidates:
+                excluded[s] = 1
+                ruled_out.append(s)
+        if symbol < 0:
+            target = decoder.target(EOF + 1 - len(ruled_out))
+            # The target-th symbol that is not excluded
+            symbol = target
+            for s in sorted(ruled_out):
+                if s <= symbol:
+                    symbol += 1
+            decoder.consume(target, 1)
+        for s in ruled_out:
+            excluded[s] = 0
+        if symbol != EOF:
+            model.update(keys, symbol)
+        return symbol
+
+    def _run(self, final):
+        if self.finished:
+            return b''
+        if self.decoder is None:
+            if len(self._input) < HEADER.size + 4:
+                if final:
+                    raise ValueError("Truncated PPM stream")
+                return b''
+            self._start()
+        out = bytearray()
+        decoder = self.decoder
+        # A symbol consumes at most a few bytes per coded escape; keep that
+        # much input buffered so the decoder never reads past what arrived
+        reserve = 4 * (self.model.order + 3)
+        while final or len(self._input) - decoder.pos >= reserve:
+            symbol = self._decode()
+            if symbol == EOF:
+                self.finished = True
+                break
+            out.append(symbol)
+        # Drop consumed input
+        if decoder.pos > 1 << 16:
+            del self._input[:decoder.pos]
+            decoder.pos = 0
+        return bytes(out)
+
+    def feed(self, chunk):
+        self._input += chunk
+        return self._run(final=False)
+
+    def flush(self):
+        out = self._run(final=True)
+        # Past the end the decoder reads zeros; needing them means data is missing
+        if not self.finished or self.decoder.pos > len(self._input):
+            raise ValueError("Truncated PPM stream")
+        return out
+
+
+def ppm_compress(data, order=DEFAULT_ORDER, memory_mb=DEFAULT_MEMORY_MB, policy='rescale'):
+    """Compress bytes; returns header + range coded stream"""
+    compressor = PPMCompressor(order, memory_mb, policy)
+    return compressor.feed(data) + compressor.flush()
+
+
+def ppm_decompress(blob):
+    """Inverse of ppm_compress"""
+    decompressor = PPMDecompressor()
+    return decompressor.feed(blob) + decompressor.flush()
+
+
+def ppm_compress_stream(src, dst, order=DEFAULT_ORDER, memory_mb=DEFAULT_MEMORY_MB,
+                        policy='rescale', chunk_size=CHUNK_SIZE):
+    """Compress file object src into dst in fixed memory; returns the compressor"""
+    compressor = PPMCompressor(order, memory_mb, policy)
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(compressor.feed(chunk))
+    dst.write(compressor.flush())
+    return compressor
+
+
+def ppm_decompress_stream(src, dst, chunk_size=CHUNK_SIZE):
+    decompressor = PPMDecompressor()
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(decompressor.feed(chunk))
+    dst.write(decompressor.flush())
+    return decompressor
+
+
+def benchmark(data, orders=(2, DEFAULT_ORDER)):
+    """Size and throughput of PPM against the gzip/bz2 used by the GUI"""
+    results = {}
+
+    def measure(name, compress, decompress):
+        start = time.perf_counter()
+        packed = compress(data)
+        middle = time.perf_counter()
+        if decompress(packed) != data:
+            raise AssertionError(f"{name} did not round-trip")
+        end = time.perf_counter()
+        results[name] = {
+            'bytes': len(packed),
+            'bits_per_byte': round(8 * len(packed) / max(1, len(data)), 3),
+            'compress_mb_s': round(len(data) / (middle - start) / 1e6, 3),
+            'decompress_mb_s': round(len(data) / (end - middle) / 1e6, 3)
+        }
+
+    measure('gzip', lambda d: gzip.compress(d, 9), gzip.decompress)
+    measure('bz2', lambda d: bz2.compress(d, 9), bz2.decompress)
+    for order in orders:
+        measure(f'ppm{order}', lambda d, o=order: ppm_compress(d, o), ppm_decompress)
+    return results
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PPM compression with a bounded context model")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    bench = commands.add_parser('bench', help="compare with gzip and bz2 on (the start of) a file")
+    bench.add_argument('path')
+    bench.add_argument('--order', type=int, action='append', help="PPM order (repeatable)")
+    bench.add_argument('--limit', type=int, default=1 << 20, help="bytes of the file to use")
+
+    for name in ('compress', 'decompress'):
+        command = commands.add_parser(name)
+        command.add_argument('src')
+        command.add_argument('dst')
+        if name == 'compress':
+            command.add_argument('--order', type=int, default=DEFAULT_ORDER)
+            command.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB,
+                                 help="ceiling for the context table")
+            command.add_argument('--policy', choices=sorted(POLICIES), default='rescale',
+                                 help="what to do when the ceiling is reached")
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        with open(args.path, 'rb') as f:
+            data = f.read(args.limit)
+        print(json.dumps(benchmark(data, args.order or (2, DEFAULT_ORDER)), indent=2))
+        return 0
+
+    start = time.perf_counter()
+    with open(args.src, 'rb') as src, open(args.dst, 'wb') as dst:
+        if args.command == 'compress':
+            codec = ppm_compress_stream(src, dst, args.order, args.memory_mb, args.policy)
+        else:
+            codec = ppm_decompress_stream(src, dst)
+    seconds = time.perf_counter() - start
+    contexts = codec.model.contexts
+    print(json.dumps(dict(
+        contexts.stats,
+        input_bytes=os.path.getsize(args.src),
+        output_bytes=os.path.getsize(args.dst),
+        seconds=round(seconds, 2),
+        contexts=len(contexts),
+        table_mb=round(contexts.used / (1 << 20), 1),
+        peak_rss_mb=_peak_rss_mb()
+    )))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
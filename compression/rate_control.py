@@ -0,0 +1,185 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+# Rate control: pick the JPEG/WebP quality that meets a byte budget or an
+# SSIM target.
+#
+# Quality is binary searched with in-memory encodes of one decoded image;
+# the luma plane used for SSIM is computed once. Every probe is kept, so a
+# quality is never encoded twice within a search. The chosen quality is
+# cached per (image hash, format, encoder, targets), and a repeat request
+# costs a single encode. Encodes default to plain JPEG/WebP; a caller with
+# its own pipeline for the format passes encoder(img, quality) -> bytes.
+
+FORMATS = {
+    'jpeg': ('JPEG', {'optimize': True}),
+    'webp': ('WEBP', {'method': 4}),
+}
+MIN_QUALITY = 5
+MAX_QUALITY = 95
+SSIM_WINDOW = 7
+
+
+class QualityCache:
+    """Thread-safe LRU of search key -> chosen quality"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            quality = self._entries.get(key)
+            if quality is not None:
+                self._entries.move_to_end(key)
+            return quality
+
+    def put(self, key, quality):
+        with self._lock:
+            self._entries[key] = quality
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+quality_cache = QualityCache()
+
+
+def prepare(img, fmt):
+    """Convert an image to a mode the format can store"""
+    if fmt == 'jpeg' and img.mode not in ('L', 'RGB'):
+        return img.convert('RGB')
+    if fmt == 'webp' and img.mode not in ('RGB', 'RGBA'):
+        return img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+    return img
+
+
+def encode(img, fmt, quality):
+    """Encoded bytes of img at the given quality, without touching disk"""
+    name, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    img.save(buffer, name, quality=int(quality), **options)
+    return buffer.getvalue()
+
+
+def image_hash(img):
+    """SHA-256 of the decoded pixels (mode and size included)"""
+    digest = hashlib.sha256(f"{img.mode}{img.size}".encode('ascii'))
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def luma(img):
+    return np.asarray(img.convert('L'), dtype=np.float64)
+
+
+def _box_mean(x, k):
+    """Mean over every k x k window (valid positions only)"""
+    s = np.pad(x, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    return (s[k:, k:] - s[:-k, k:] - s[k:, :-k] + s[:-k, :-k]) / (k * k)
+
+
+def ssim(reference, candidate, window=SSIM_WINDOW):
+    """Mean SSIM of two luma planes (0-255) over window x window boxes"""
+    k = min(window, *reference.shape)
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    mx, my = _box_mean(reference, k), _box_mean(candidate, k)
+    vx = _box_mean(reference * reference, k) - mx * mx
+    vy = _box_mean(candidate * candidate, k) - my * my
+    cov = _box_mean(reference * candidate, k) - mx * my
+    s = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+    return float(s.mean())
+
+
+def _bisect(lo, hi, ok):
+    """Smallest q in [lo, hi] with ok(q), assuming ok is monotone; hi + 1 if none"""
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if ok(mid):
+            hi = mid - 1
+        else:
+            lo = mid + 1
+    return lo
+
+
+def search_quality(img, fmt='jpeg', target_bytes=None, target_ssim=None,
+                   min_quality=MIN_QUALITY, max_quality=MAX_QUALITY, cache=quality_cache,
+                   encoder=None):
+    """Find a quality for img that meets target_bytes and/or target_ssim
+
+    target_bytes picks the highest quality whose output fits the budget;
+    target_ssim the lowest quality that reaches the SSIM (within the budget
+    when both are given). Returns a dict with the chosen quality, the
+    encoded data and its size, ssim (if requested), met (False when no
+    quality in range satisfies the targets), encodes and cached.
+
+    Output size is assumed to grow with quality: a budget that max_quality
+    fits costs one encode, and with both targets the lowest quality that
+    reaches the SSIM is also the smallest candidate, so the budget is only
+    bisected when that one does not fit.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if target_bytes is None and target_ssim is None:
+        raise ValueError("target_bytes or target_ssim is required")
+
+    img = prepare(img, fmt)
+    reference = luma(img) if target_ssim is not None else None
+    probes = {}
+
+    def probe(quality):
+        if quality not in probes:
+            data = encoder(img, quality) if encoder is not None else encode(img, fmt, quality)
+            score = None
+            if reference is not None:
+                with Image.open(io.BytesIO(data)) as decoded:
+                    score = ssim(reference, luma(decoded))
+            probes[quality] = (data, score)
+        return probes[quality]
+
+    def fits(quality):
+        return target_bytes is None or len(probe(quality)[0]) <= target_bytes
+
+    def reaches(quality):
+        return target_ssim is None or probe(quality)[1] >= target_ssim
+
+    def highest_fitting(hi):
+        # One below the first quality that does not fit
+        if fits(hi):
+            return hi
+        return max(_bisect(min_quality, hi - 1, lambda q: not fits(q)) - 1, min_quality)
+
+    key = (image_hash(img), fmt, getattr(encoder, '__qualname__', None),
+           target_bytes, target_ssim, min_quality, max_quality)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        quality = cached
+    else:
+        if target_ssim is None:
+            quality = highest_fitting(max_quality)
+        else:
+            quality = min(_bisect(min_quality, max_quality, reaches), max_quality)
+            if not fits(quality):
+                # The SSIM costs more than the budget: best quality that fits
+                quality = highest_fitting(quality - 1) if quality > min_quality else min_quality
+        if cache is not None:
+            cache.put(key, quality)
+
+    data, score = probe(quality)
+    result = {
+        'quality': quality,
+        'data': data,
+        'size': len(data),
+        'met': fits(quality) and reaches(quality),
+        'encodes': len(probes),
+        'cached': cached is not None,
+    }
+    if target_ssim is not None:
+        result['ssim'] = round(score, 4)
+    return result
@@ -0,0 +1,114 @@
+import numpy as np
+
+# Byte-level run length encoding.
+#
+# Layout: varint(number of runs), the run values (one byte each), then one
+# varint per run length. Unlike the "3a" text format this never confuses a
+# count with a digit in the data.
+#
+# Both directions are vectorized with NumPy. Input is read through the
+# buffer protocol (bytes, bytearray, memoryview, mmap, uint8 arrays) without
+# copying it.
+
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        value |= (byte & 0x7F) << shift
+        pos += 1
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _as_bytes_array(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if isinstance(data, np.ndarray):
+        return data.reshape(-1).view(np.uint8)
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def find_runs(data):
+    """(values, lengths) of the runs in a byte buffer, as NumPy arrays"""
+    arr = _as_bytes_array(data)
+    if not arr.size:
+        return arr[:0], np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(arr[1:] != arr[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.append(starts, arr.size))
+    return arr[starts], lengths
+
+
+def encode_varints(values):
+    """LEB128 encoding of an array of non-negative integers, vectorized"""
+    values = np.asarray(values, dtype=np.uint64)
+    if not values.size:
+        return b''
+    # Bytes needed per value: 1 + number of 7-bit groups above the first
+    sizes = np.ones(values.size, dtype=np.int64)
+    limit = np.uint64(1 << 7)
+    while True:
+        more = values >= limit
+        if not more.any():
+            break
+        sizes += more
+        if limit >= np.uint64(1 << 63):
+            break
+        limit <<= np.uint64(7)
+
+    offsets = np.cumsum(sizes) - sizes
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    for k in range(int(sizes.max())):
+        active = sizes > k
+        group = (values[active] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        continues = (sizes[active] > k + 1).astype(np.uint8) << 7
+        out[offsets[active] + k] = group.astype(np.uint8) | continues
+    return out.tobytes()
+
+
+def decode_varints(data, count):
+    """Decode count LEB128 integers; returns (uint64 array, bytes used)"""
+    arr = _as_bytes_array(data)
+    ends = np.flatnonzero(arr < 0x80)[:count]
+    if ends.size < count:
+        raise ValueError("Truncated varint data")
+    used = int(ends[-1]) + 1 if count else 0
+    arr = arr[:used]
+    if used == count:
+        # Fast path: every value fits in one byte
+        return arr.astype(np.uint64), used
+
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    group = np.repeat(np.arange(count), ends - starts + 1)
+    shift = (np.arange(used) - starts[group]).astype(np.uint64) * np.uint64(7)
+    parts = (arr & 0x7F).astype(np.uint64) << shift
+    return np.add.reduceat(parts, starts), used
+
+
+def rle_encode(data):
+    """Encode bytes (or str as UTF-8) as runs"""
+    values, lengths = find_runs(data)
+    out = bytearray()
+    _put_varint(out, values.size)
+    return bytes(out) + values.tobytes() + encode_varints(lengths)
+
+
+def rle_decode(blob):
+    """Inverse of rle_encode"""
+    if not blob:
+        return b''
+    blob = memoryview(blob)
+    count, pos = _get_varint(blob, 0)
+    values = np.frombuffer(blob, dtype=np.uint8, count=count, offset=pos)
+    lengths, _ = decode_varints(blob[pos + count:], count)
+    return np.repeat(values, lengths.astype(np.int64)).tobytes()
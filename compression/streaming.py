@@ -0,0 +1,154 @@
+import struct
+from .huffman import huffman_encode, huffman_decode
+from .lz77 import lz77_compress, lz77_decompress
+from .rle import rle_encode, rle_decode
+from .ppm import ppm_compress, ppm_decompress
+
+# Block-framed streaming container.
+#
+# Input is cut into blocks of block_size bytes and every block is compressed
+# on its own, so memory is bounded by the block size instead of the input.
+#
+#   header: b'CZ' + version + codec id
+#   frame:  uint32 raw length + uint32 payload length + payload
+#   end:    a frame with both lengths zero
+
+MAGIC = b'CZ'
+VERSION = 1
+DEFAULT_BLOCK_SIZE = 1 << 20
+FRAME = struct.Struct('>II')
+
+CODECS = {
+    'huffman': (1, huffman_encode, huffman_decode),
+    'rle': (2, rle_encode, rle_decode),
+    'lz77': (3, lz77_compress, lz77_decompress),
+    'ppm': (4, ppm_compress, ppm_decompress),
+}
+CODEC_IDS = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+
+
+class Compressor:
+    """Incremental compressor: feed() chunks of any size, then flush()"""
+
+    def __init__(self, algorithm='huffman', block_size=DEFAULT_BLOCK_SIZE):
+        algorithm = algorithm.lower()
+        if algorithm not in CODECS:
+            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.block_size = block_size
+        self._codec_id, self._encode, _ = CODECS[algorithm]
+        self._buffer = bytearray()
+        self._started = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _header(self):
+        if self._started:
+            return b''
+        self._started = True
+        return MAGIC + bytes([VERSION, self._codec_id])
+
+    def _frame(self, block):
+        payload = self._encode(bytes(block)) if block else b''
+        return FRAME.pack(len(block), len(payload)) + payload
+
+    def feed(self, chunk):
+        """Buffer a chunk and return the frames of any completed blocks"""
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self.bytes_in += len(chunk)
+        self._buffer += chunk
+
+        out = [self._header()]
+        while len(self._buffer) >= self.block_size:
+            out.append(self._frame(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+        result = b''.join(out)
+        self.bytes_out += len(result)
+        return result
+
+    def flush(self):
+        """Compress whatever is buffered and close the stream"""
+        out = self._header()
+        if self._buffer:
+            out += self._frame(self._buffer)
+            self._buffer = bytearray()
+        out += FRAME.pack(0, 0)
+        self.bytes_out += len(out)
+        return out
+
+
+class Decompressor:
+    """Incremental decompressor for streams written by Compressor"""
+
+    def __init__(self):
+        self.algorithm = None
+        self.finished = False
+        self._decode = None
+        self._buffer = bytearray()
+
+    def feed(self, chunk):
+        """Consume compressed bytes and return the decompressed bytes available"""
+        self._buffer += chunk
+        out = []
+
+        if self._decode is None:
+            if len(self._buffer) < 4:
+                return b''
+            if self._buffer[:2] != MAGIC or self._buffer[2] != VERSION:
+                raise ValueError("Not a compressed stream")
+            codec_id = self._buffer[3]
+            if codec_id not in CODEC_IDS:
+                raise ValueError(f"Unknown codec id: {codec_id}")
+            self.algorithm = CODEC_IDS[codec_id]
+            self._decode = CODECS[self.algorithm][2]
+            del self._buffer[:4]
+
+        while not self.finished and len(self._buffer) >= FRAME.size:
+            raw_len, payload_len = FRAME.unpack_from(self._buffer)
+            if raw_len == 0 and payload_len == 0:
+                self.finished = True
+                del self._buffer[:FRAME.size]
+                break
+            end = FRAME.size + payload_len
+            if len(self._buffer) < end:
+                break
+            block = self._decode(bytes(self._buffer[FRAME.size:end]))
+            if len(block) != raw_len:
+                raise ValueError("Corrupt block: length mismatch")
+            out.append(block)
+            del self._buffer[:end]
+
+        return b''.join(out)
+
+    def flush(self):
+        if not self.finished:
+            raise ValueError("Truncated compressed stream")
+        return b''
+
+
+def compress_stream(src, dst, algorithm='huffman', block_size=DEFAULT_BLOCK_SIZE):
+    """Compress file object src into dst block by block; returns (bytes_in, bytes_out)"""
+    compressor = Compressor(algorithm, block_size)
+    while True:
+        chunk = src.read(block_size)
+        if not chunk:
+            break
+        dst.write(compressor.feed(chunk))
+    dst.write(compressor.flush())
+    return compressor.bytes_in, compressor.bytes_out
+
+
+def decompress_stream(src, dst, chunk_size=1 << 16):
+    """Decompress file object src into dst; returns bytes written"""
+    decompressor = Decompressor()
+    written = 0
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        block = decompressor.feed(chunk)
+        dst.write(block)
+        written += len(block)
+    decompressor.flush()
+    return written
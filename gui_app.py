@@ -1,6 +1,6 @@
 # gui_app.py - Enhanced Compression GUI Application with Advanced Image Compression
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, StringVar, IntVar
+from tkinter import ttk, filedialog, messagebox, StringVar, IntVar, BooleanVar
 import os
 import threading
 import time
@@ -11,11 +11,9 @@ from PIL import Image, ImageTk
 import shutil
 from pathlib import Path
 import webbrowser
-import numpy as np
-import pywt
-import heapq
-import struct
-from collections import defaultdict
+from compression.streaming import compress_stream
+from compression.container import dctc_encode, dctc_decode, dwtc_encode, dwtc_decode
+from compression.dwt import LARGE_IMAGE_PIXELS, image_pixels, tiled_threshold_file
 
 class CompressionGUI:
     def __init__(self, root):
@@ -32,6 +30,7 @@ class CompressionGUI:
         self.compression_method = StringVar(value="zip")
         self.quality_var = IntVar(value=85)
         self.compression_level_var = IntVar(value=6)  # For DCT/DWT compression
+        self.chroma_subsample_var = BooleanVar(value=True)  # 4:2:0 for colour DCT/DWT
         self.progress_var = IntVar(value=0)
         self.compression_thread = None
         self.stop_compression = False
@@ -125,6 +124,8 @@ class CompressionGUI:
         self.compression_level_value = ttk.Label(self.compression_level_frame, text="6")
         self.compression_level_value.grid(row=0, column=2, padx=(0, 5))
         self.compression_level_scale.configure(command=self.update_compression_level_label)
+        ttk.Checkbutton(self.compression_level_frame, text="4:2:0 chroma",
+                        variable=self.chroma_subsample_var).grid(row=0, column=3, padx=(5, 0))
         self.compression_level_frame.grid_remove()
         
         # Progress area
@@ -537,43 +538,30 @@ class CompressionGUI:
             output_path = os.path.join(os.path.dirname(file_path), f"{name}_dct_compressed.jpg")
             start_time = time.time()
             
-            # Load image and convert to grayscale for simplicity
-            img = Image.open(file_path).convert('L')
-            img_array = np.array(img, dtype=np.float32)
-            
-            # Perform block DCT
-            block_size = 8
-            height, width = img_array.shape
-            compressed_img = np.zeros_like(img_array)
-            
-            # Process each 8x8 block
-            for i in range(0, height, block_size):
-                for j in range(0, width, block_size):
-                    block = img_array[i:i+block_size, j:j+block_size]
-                    if block.shape[0] != block_size or block.shape[1] != block_size:
-                        continue  # Skip incomplete blocks
-                    
-                    # Apply DCT
-                    dct_block = self.apply_dct(block)
-                    
-                    # Quantization - keep only the top coefficients based on compression level
-                    threshold = (11 - compression_level) * 5  # Higher level = more compression
-                    dct_block[np.abs(dct_block) < threshold] = 0
-                    
-                    # Store compressed block
-                    compressed_img[i:i+block_size, j:j+block_size] = dct_block
+            # Colour images are coded as Y, Cb, Cr planes, transformed in parallel
+            img = Image.open(file_path)
+            subsample = self.chroma_subsample_var.get()
             
-            # Convert back to image
-            compressed_img = Image.fromarray(np.uint8(compressed_img))
-            compressed_img.save(output_path)
+            # Quantization - keep only the top coefficients based on compression level
+            threshold = (11 - compression_level) * 5  # Higher level = more compression
             
-            compressed_size = os.path.getsize(output_path)
+            # Entropy-coded coefficient container - the actual compressed file
+            blob = dctc_encode(img, threshold=threshold, subsample=subsample)
+            container_path = os.path.join(os.path.dirname(file_path), f"{name}_dct.dctc")
+            with open(container_path, 'wb') as f:
+                f.write(blob)
+            
+            # The preview is the container decoded, i.e. exactly what was saved
+            dctc_decode(blob).save(output_path)
+            
+            compressed_size = os.path.getsize(container_path)
             ratio = self.calculate_ratio(original_size, compressed_size)
             
-            self.compressed_files.append(output_path)
+            self.compressed_files.extend([container_path, output_path])
             
             self.add_result("--- DCT Compression ---", 'header')
-            self.add_result(f"✓ Output: {os.path.basename(output_path)}", 'success')
+            self.add_result(f"✓ Output: {os.path.basename(container_path)}", 'success')
+            self.add_result(f"✓ Preview: {os.path.basename(output_path)}", 'success')
             self.add_result(f"✓ Compression Level: {compression_level}", 'success')
             self.add_result(f"✓ Size: {self.format_size(compressed_size)}", 'success')
             self.add_result(f"✓ Ratio: {ratio}", 'success')
@@ -583,28 +571,6 @@ class CompressionGUI:
         except Exception as e:
             self.add_result(f"✗ DCT Error: {str(e)}", 'error')
 
-    def apply_dct(self, block):
-        """Apply 2D DCT to a block"""
-        # Simple DCT implementation (in practice, you'd use scipy.fftpack.dct)
-        M, N = block.shape
-        dct_block = np.zeros_like(block)
-        
-        for u in range(M):
-            for v in range(N):
-                sum_val = 0.0
-                cu = 1.0 if u == 0 else np.sqrt(2)/2
-                cv = 1.0 if v == 0 else np.sqrt(2)/2
-                
-                for i in range(M):
-                    for j in range(N):
-                        cos_u = np.cos((2*i+1)*u*np.pi/(2*M))
-                        cos_v = np.cos((2*j+1)*v*np.pi/(2*N))
-                        sum_val += block[i,j] * cos_u * cos_v
-                
-                dct_block[u,v] = 0.25 * cu * cv * sum_val
-                
-        return dct_block
-
     def compress_dwt(self, file_path, name, original_size, compression_level, base_progress=0):
         """Compress image using Discrete Wavelet Transform (DWT)"""
         try:
@@ -614,42 +580,45 @@ class CompressionGUI:
             output_path = os.path.join(os.path.dirname(file_path), f"{name}_dwt_compressed.jpg")
             start_time = time.time()
             
-            # Load image and convert to grayscale for simplicity
-            img = Image.open(file_path).convert('L')
-            img_array = np.array(img, dtype=np.float32)
-            
-            # Perform wavelet decomposition
-            coeffs = pywt.wavedec2(img_array, 'haar', level=3)
-            
             # Threshold coefficients based on compression level
             threshold = (11 - compression_level) * 5  # Higher level = more compression
-            coeffs_thresh = [coeffs[0]]  # Keep approximation coefficients
-            
-            for detail in coeffs[1:]:
-                if isinstance(detail, tuple):
-                    # For horizontal, vertical, diagonal details
-                    detail_thresh = []
-                    for d in detail:
-                        d_thresh = pywt.threshold(d, threshold, mode='soft')
-                        detail_thresh.append(d_thresh)
-                    coeffs_thresh.append(tuple(detail_thresh))
-                else:
-                    # For approximation coefficients (shouldn't happen at level > 0)
-                    coeffs_thresh.append(pywt.threshold(detail, threshold, mode='soft'))
-            
-            # Reconstruct image
-            compressed_img = pywt.waverec2(coeffs_thresh, 'haar')
-            compressed_img = np.clip(compressed_img, 0, 255)  # Ensure valid pixel values
-            compressed_img = Image.fromarray(np.uint8(compressed_img))
-            compressed_img.save(output_path)
             
-            compressed_size = os.path.getsize(output_path)
+            # Very large scans are thresholded tile by tile straight to the output
+            if image_pixels(file_path) > LARGE_IMAGE_PIXELS:
+                output_path = os.path.join(os.path.dirname(file_path), f"{name}_dwt_compressed.png")
+                tiled_threshold_file(file_path, output_path, threshold, 'haar', level=3)
+                compressed_size = os.path.getsize(output_path)
+                self.compressed_files.append(output_path)
+                self.add_result("--- DWT Compression (tiled) ---", 'header')
+                self.add_result(f"✓ Output: {os.path.basename(output_path)}", 'success')
+                self.add_result(f"✓ Compression Level: {compression_level}", 'success')
+                self.add_result(f"✓ Size: {self.format_size(compressed_size)}", 'success')
+                self.add_result(f"✓ Ratio: {self.calculate_ratio(original_size, compressed_size)}", 'success')
+                self.add_result(f"✓ Time: {time.time() - start_time:.2f}s", 'success')
+                self.add_result("")
+                return
+            
+            # Colour images are coded as Y, Cb, Cr planes, transformed in parallel
+            img = Image.open(file_path)
+            subsample = self.chroma_subsample_var.get()
+            
+            # Entropy-coded coefficient container - the actual compressed file
+            blob = dwtc_encode(img, threshold=threshold, subsample=subsample)
+            container_path = os.path.join(os.path.dirname(file_path), f"{name}_dwt.dwtc")
+            with open(container_path, 'wb') as f:
+                f.write(blob)
+            
+            # The preview is the container decoded, i.e. exactly what was saved
+            dwtc_decode(blob).save(output_path)
+            
+            compressed_size = os.path.getsize(container_path)
             ratio = self.calculate_ratio(original_size, compressed_size)
             
-            self.compressed_files.append(output_path)
+            self.compressed_files.extend([container_path, output_path])
             
             self.add_result("--- DWT Compression ---", 'header')
-            self.add_result(f"✓ Output: {os.path.basename(output_path)}", 'success')
+            self.add_result(f"✓ Output: {os.path.basename(container_path)}", 'success')
+            self.add_result(f"✓ Preview: {os.path.basename(output_path)}", 'success')
             self.add_result(f"✓ Compression Level: {compression_level}", 'success')
             self.add_result(f"✓ Size: {self.format_size(compressed_size)}", 'success')
             self.add_result(f"✓ Ratio: {ratio}", 'success')
@@ -668,63 +637,9 @@ class CompressionGUI:
             output_path = os.path.join(os.path.dirname(file_path), f"{name}_huffman_compressed.bin")
             start_time = time.time()
             
-            # Read file data
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
-            # Build frequency table
-            freq = defaultdict(int)
-            for byte in data:
-                freq[byte] += 1
-            
-            # Build Huffman tree
-            heap = [[weight, [symbol, ""]] for symbol, weight in freq.items()]
-            heapq.heapify(heap)
-            
-            while len(heap) > 1:
-                lo = heapq.heappop(heap)
-                hi = heapq.heappop(heap)
-                for pair in lo[1:]:
-                    pair[1] = '0' + pair[1]
-                for pair in hi[1:]:
-                    pair[1] = '1' + pair[1]
-                heapq.heappush(heap, [lo[0] + hi[0]] + lo[1:] + hi[1:])
-            
-            # Create encoding dictionary
-            huff_dict = dict(heap[0][1:])
-            
-            # Encode data
-            encoded_bits = ''.join([huff_dict[byte] for byte in data])
-            
-            # Pad with zeros to make length multiple of 8
-            padding = 8 - len(encoded_bits) % 8
-            encoded_bits += '0' * padding
-            
-            # Convert to bytes
-            encoded_bytes = bytearray()
-            for i in range(0, len(encoded_bits), 8):
-                byte = encoded_bits[i:i+8]
-                encoded_bytes.append(int(byte, 2))
-            
-            # Save compressed file (header: padding + dict size + dict + data)
-            with open(output_path, 'wb') as f:
-                # Write padding info (1 byte)
-                f.write(struct.pack('B', padding))
-                
-                # Write dictionary size (2 bytes)
-                dict_size = len(huff_dict)
-                f.write(struct.pack('H', dict_size))
-                
-                # Write dictionary (each entry: byte + code length + code)
-                for byte, code in huff_dict.items():
-                    code_len = len(code)
-                    code_int = int(code, 2)
-                    f.write(struct.pack('B', byte))
-                    f.write(struct.pack('B', code_len))
-                    f.write(struct.pack('H', code_int))  # Store code in 2 bytes
-                
-                # Write compressed data
-                f.write(encoded_bytes)
+            # Canonical Huffman over 1 MB blocks, streamed from disk
+            with open(file_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
+                compress_stream(f_in, f_out, 'huffman')
             
             compressed_size = os.path.getsize(output_path)
             ratio = self.calculate_ratio(original_size, compressed_size)
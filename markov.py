@@ -1,8 +1,22 @@
 import math
-from collections import defaultdict
+from collections import defaultdict, Counter
+from compression.ppm import ppm_compress, ppm_decompress, DEFAULT_ORDER
 # metode ppm (Prediction by Partial Matching) untuk kompresi teks/ metdoe markov 
 # metode huffman coding
-def calculate_ppm_compression(text):
+def calculate_ppm_compression(text, adaptive=False, detail=True):
+    """Estimate the PPM (order-1 with order-0 fallback) cost of text in bits
+    
+    The default static mode counts the whole text first and then prices
+    every character with the final counts. adaptive=True makes one pass
+    instead, pricing every character with the counts seen so far, as a real
+    decoder would have to (see AdaptivePPM). detail chooses the
+    per-character list of (index, char, bits): True for every character,
+    an int n for every n-th character, False for none (an empty list).
+    """
+    if adaptive:
+        model = AdaptivePPM(detail)
+        model.feed(text)
+        return dict(model.result(), original_text=text)
     
     order0_freq = defaultdict(int)
     for char in text:
@@ -48,7 +62,8 @@ def calculate_ppm_compression(text):
                 bits = -math.log2(prob)
         
         total_bits += bits
-        bits_per_char.append((char, bits))
+        if detail is True or (detail and i % detail == 0):
+            bits_per_char.append((i, char, bits))
     
   
     original_bits = len(text) * 8  
@@ -65,6 +80,155 @@ def calculate_ppm_compression(text):
         'escape_prob': escape_prob
     }
 
+class AdaptivePPM:
+    """Single-pass adaptive version of calculate_ppm_compression
+    
+    Every character is priced with the counts seen so far and only then
+    counted: P(c|prev) = n(prev, c) / (n(prev) + 1), and on an escape
+    (probability 1 / (n(prev) + 1)) the order-0 counts are tried the same
+    way, then a uniform 1/256. Unlike the static estimate, this charges for
+    the character coded after an escape. feed() takes chunks of any size;
+    memory is O(contexts) unless the full per-character detail is kept.
+    """
+    
+    def __init__(self, detail=False):
+        self.detail = detail
+        self.order0_freq = defaultdict(int)
+        self.order1_freq = defaultdict(lambda: defaultdict(int))
+        self.context_total = defaultdict(int)
+        self.total_chars = 0
+        self.total_bits = 0.0
+        self.escapes = 0
+        self.bits_per_char = []
+        self.last_char = None
+    
+    def feed(self, text):
+        order0_freq = self.order0_freq
+        order1_freq = self.order1_freq
+        context_total = self.context_total
+        detail = self.detail
+        context = self.last_char
+        i = self.total_chars
+        log2 = math.log2
+        
+        for char in text:
+            if context is not None and order1_freq[context].get(char):
+                bits = -log2(order1_freq[context][char] / (context_total[context] + 1))
+            else:
+                # Escape from order 1 (free with no context yet), then order 0
+                bits = log2(context_total[context] + 1) if context is not None else 0.0
+                self.escapes += 1
+                if order0_freq.get(char):
+                    bits -= log2(order0_freq[char] / (i + 1))
+                else:
+                    bits += log2(i + 1) + 8
+            
+            self.total_bits += bits
+            if detail is True or (detail and i % detail == 0):
+                self.bits_per_char.append((i, char, bits))
+            
+            order0_freq[char] += 1
+            if context is not None:
+                order1_freq[context][char] += 1
+                context_total[context] += 1
+            context = char
+            i += 1
+        
+        self.last_char = context
+        self.total_chars = i
+    
+    def result(self):
+        total_chars = self.total_chars
+        if total_chars == 0:
+            raise ValueError("No text was fed")
+        
+        order1_prob = {
+            context: {char: freq / (self.context_total[context] + 1) for char, freq in freqs.items()}
+            for context, freqs in self.order1_freq.items()
+        }
+        original_bits = total_chars * 8
+        result = {
+            'original_bits': original_bits,
+            'compressed_bits': self.total_bits,
+            'compression_ratio': (original_bits - self.total_bits) / original_bits * 100,
+            'escapes': self.escapes,
+            'order0_prob': {char: freq / total_chars for char, freq in self.order0_freq.items()},
+            'order1_prob': order1_prob,
+            'escape_prob': {context: 1 / (total + 1) for context, total in self.context_total.items()},
+            'bits_per_char': self.bits_per_char,
+        }
+        return result
+
+class PPMStream:
+    """Streaming version of calculate_ppm_compression
+
+    feed() the text in chunks of any size; flush() returns the same statistics
+    (without the per-character detail). Only the counts are kept, so memory
+    is O(contexts) instead of O(text length).
+    """
+
+    def __init__(self):
+        self.order0_freq = Counter()
+        self.pair_freq = Counter()
+        self.first_char = None
+        self.last_char = None
+        self.total_chars = 0
+
+    def feed(self, text):
+        if not text:
+            return
+        if self.first_char is None:
+            self.first_char = text[0]
+            pairs = zip(text, text[1:])
+        else:
+            pairs = zip(self.last_char + text, text)
+        self.order0_freq.update(text)
+        self.pair_freq.update(pairs)
+        self.last_char = text[-1]
+        self.total_chars += len(text)
+
+    def flush(self):
+        total_chars = self.total_chars
+        if total_chars == 0:
+            raise ValueError("No text was fed")
+
+        order0_prob = {char: freq/total_chars for char, freq in self.order0_freq.items()}
+
+        context_total = defaultdict(int)
+        for (context, _), freq in self.pair_freq.items():
+            context_total[context] += freq
+
+        order1_prob = defaultdict(dict)
+        escape_prob = {}
+        # The model is static, so the cost of every occurrence of a pair is
+        # the same and the total can be computed from the counts alone
+        total_bits = -math.log2(order0_prob[self.first_char])
+        for (context, char), freq in self.pair_freq.items():
+            prob = freq / (context_total[context] + 1)
+            order1_prob[context][char] = prob
+            total_bits += freq * -math.log2(prob)
+        for context, total in context_total.items():
+            escape_prob[context] = 1 / (total + 1)
+
+        original_bits = total_chars * 8
+        compression_ratio = (original_bits - total_bits) / original_bits * 100
+
+        return {
+            'original_bits': original_bits,
+            'compressed_bits': total_bits,
+            'compression_ratio': compression_ratio,
+            'order0_prob': order0_prob,
+            'order1_prob': dict(order1_prob),
+            'escape_prob': escape_prob
+        }
+
+def compress_text(text, order=DEFAULT_ORDER):
+    """Real PPM compression (range coded) of the UTF-8 text"""
+    return ppm_compress(text.encode('utf-8'), order)
+
+def decompress_text(blob):
+    return ppm_decompress(blob).decode('utf-8')
+
 def main():
     print("=== Program Kompresi Teks dengan PPM ===")
     print("Masukkan teks yang ingin dikompresi (tekan Enter 2 kali untuk selesai):")
@@ -96,8 +260,15 @@ def main():
     print(f"Total bit setelah kompresi PPM: {result['compressed_bits']:.2f} bit")
     print(f"Rasio kompresi: {result['compression_ratio']:.1f}% lebih efisien")
 
+    adaptive = calculate_ppm_compression(text, adaptive=True, detail=False)
+    print(f"Estimasi adaptif satu lintasan: {adaptive['compressed_bits']:.2f} bit")
+
+    compressed = compress_text(text)
+    assert decompress_text(compressed) == text
+    print(f"Ukuran nyata PPM orde-{DEFAULT_ORDER} (range coder): {len(compressed) * 8} bit ({len(compressed)} byte)")
+
     print("\nDetail bit per karakter:")
-    for i, (char, bits) in enumerate(result['bits_per_char']):
+    for i, char, bits in result['bits_per_char']:
         print(f"Karakter {i+1}: '{char}' = {bits:.2f} bit")
 
     print("\nProbabilitas Orde-0:")
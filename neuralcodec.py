@@ -2,6 +2,8 @@ import torch
 import torch.nn as nn
 import numpy as np
 import base64
+from utils.model_export import optimize_and_report
+from utils.char_tensor import vocab_indices, one_hot, argmax_text
 
 # ===============================
 # NEURAL CODEC (AUTOENCODER TEXT)
@@ -28,18 +30,14 @@ class NeuralCodec(nn.Module):
 # UTILITAS KONVERSI
 # ===============================
 def text_to_tensor(text, vocab):
-    one_hot = torch.zeros(len(text), len(vocab))
-    for i, ch in enumerate(text):
-        idx = vocab.index(ch)
-        one_hot[i][idx] = 1
-    return one_hot
+    indices = vocab_indices(text, vocab)
+    if (indices < 0).any():
+        missing = text[int(np.argmax(indices < 0))]
+        raise ValueError(f"{missing!r} is not in list")
+    return one_hot(indices, len(vocab))
 
 def tensor_to_text(tensor, vocab):
-    chars = []
-    for row in tensor:
-        idx = torch.argmax(row).item()
-        chars.append(vocab[idx])
-    return ''.join(chars)
+    return argmax_text(tensor, vocab)
 
 # ===============================
 # KOMPRESI
@@ -92,6 +90,11 @@ def main():
         loss.backward()
         optimizer.step()
 
+    # Model INT8 TorchScript untuk inferensi CPU, dibandingkan dengan model asli
+    model, report = optimize_and_report(model, data)
+    print(f"Model INT8 TorchScript: {report['speedup']}x lebih cepat, "
+          f"{report['argmax_agreement']*100:.1f}% karakter sama")
+
     # Kompresi
     encoded_b64 = kompresi_neural_codec(teks, model, vocab)
     print("\n Teks terkompresi (base64):\n", encoded_b64)
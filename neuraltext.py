@@ -3,7 +3,12 @@ import torch.nn as nn
 import numpy as np
 import base64
 import json
+import string
 from typing import Tuple, Dict, Any
+from utils.model_export import optimize_and_report
+from utils.char_tensor import vocab_indices, one_hot, argmax_text
+from utils.model_registry import ModelRegistry, IncompatibleModelError, config_hash
+from utils.wire_format import pack_latent, unpack_latent
 
 # --- Enhanced Neural Codec Model with Lossy Compression ---
 class LossyTextAutoencoder(nn.Module):
@@ -64,27 +69,14 @@ class LossyTextAutoencoder(nn.Module):
 # --- Helper Functions ---
 def text_to_tensor(text, vocab):
     """Convert text to one-hot tensor representation"""
-    tensor = torch.zeros(len(text), len(vocab))
-    for i, char in enumerate(text):
-        if char in vocab:
-            tensor[i][vocab.index(char)] = 1
-    return tensor
+    # Characters outside the vocab become all-zero rows
+    return one_hot(vocab_indices(text, vocab), len(vocab))
 
 def tensor_to_text(tensor, vocab, threshold=0.5):
     """Convert tensor back to text with confidence threshold"""
-    text = ''
-    for vec in tensor:
-        # Get the character with highest probability
-        max_idx = torch.argmax(vec).item()
-        max_prob = vec[max_idx].item()
-        
-        # Only use character if confidence is above threshold
-        if max_prob > threshold:
-            text += vocab[max_idx]
-        else:
-            # Use most likely character but mark uncertainty
-            text += vocab[max_idx]  # Could add uncertainty markers here
-    return text
+    # The most likely character is used even below the threshold
+    # (uncertainty markers could be added here)
+    return argmax_text(tensor, vocab)
 
 # --- Lossy Compression Functions ---
 def compress_neural_lossy(text, model, vocab, quality_factor=0.8):
@@ -155,13 +147,14 @@ def calculate_compression_metrics(original_text, compressed_data, decompressed_t
         'space_savings': (1 - compressed_size / original_size) * 100
     }
 
-def train_model_on_text(model, text, vocab, epochs=300, lr=0.01):
+def train_model_on_text(model, text, vocab, epochs=300, lr=0.01, verbose=True):
     """Train the model on the input text"""
     data = text_to_tensor(text, vocab)
     optimizer = torch.optim.Adam(model.parameters(), lr=lr)
     loss_fn = nn.MSELoss()
     
-    print(f"Training model on {len(text)} characters...")
+    if verbose:
+        print(f"Training model on {len(text)} characters...")
     
     for epoch in range(epochs):
         output, _ = model(data)
@@ -171,11 +164,280 @@ def train_model_on_text(model, text, vocab, epochs=300, lr=0.01):
         loss.backward()
         optimizer.step()
         
-        if (epoch + 1) % 50 == 0:
+        if verbose and (epoch + 1) % 50 == 0:
             print(f"Epoch {epoch+1}/{epochs}, Loss: {loss.item():.6f}")
     
     return model
 
+# --- Pretrained Codec (train once, inference only per call) ---
+REGISTRY_NAME = 'lossy_text_autoencoder'
+
+def corpus_vocab(corpus):
+    """Fixed vocabulary: every corpus character plus printable ASCII"""
+    return sorted(set(corpus) | set(string.printable))
+
+def train_on_corpus(corpus, vocab=None, hidden_dim=64, compression_ratio=4,
+                    steps=2000, batch_size=512, lr=0.005, verbose=True):
+    """Fit one LossyTextAutoencoder on a whole corpus; returns (model, vocab)"""
+    vocab = vocab or corpus_vocab(corpus)
+    model = LossyTextAutoencoder(len(vocab), hidden_dim, compression_ratio)
+    indices = torch.from_numpy(vocab_indices(corpus, vocab))
+    indices = indices[indices >= 0]
+    # Every vocab symbol at least once per batch, the rest sampled by corpus frequency
+    everything = torch.arange(len(vocab))
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = nn.NLLLoss()
+    
+    model.train()
+    for step in range(steps):
+        batch = torch.cat([everything, indices[torch.randint(len(indices), (batch_size,))]])
+        output, _ = model(one_hot(batch, len(vocab)))
+        loss = loss_fn(torch.log(output + 1e-9), batch)
+        
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        
+        if verbose and (step + 1) % 500 == 0:
+            print(f"Step {step+1}/{steps}, Loss: {loss.item():.6f}")
+    
+    return model.eval(), vocab
+
+class PretrainedTextCodec:
+    """Inference-only codec around a registered LossyTextAutoencoder
+    
+    The vocabulary belongs to the model, so payloads carry only the packed
+    latent (utils.wire_format) and the model version/config hash.
+    """
+    
+    def __init__(self, model, vocab, version=0):
+        self.model = model.eval()
+        self.vocab = list(vocab)
+        self.config = {
+            'vocab': ''.join(self.vocab),
+            'hidden_dim': model.hidden_dim,
+            'bottleneck_dim': model.bottleneck_dim
+        }
+        self.config_hash = config_hash(self.config)
+        self.version = version
+    
+    @classmethod
+    def load(cls, registry_dir='models', version=None):
+        arrays, info = ModelRegistry(registry_dir).load(REGISTRY_NAME, version)
+        config = info['config']
+        vocab = list(config['vocab'])
+        model = LossyTextAutoencoder(len(vocab), config['hidden_dim'],
+                                     config['hidden_dim'] // config['bottleneck_dim'])
+        # The memory-mapped arrays become the parameters without a copy
+        model.load_state_dict({k: torch.from_numpy(v) for k, v in arrays.items()}, assign=True)
+        return cls(model, vocab, info['version'])
+    
+    def save(self, registry_dir='models'):
+        self.version = ModelRegistry(registry_dir).save(REGISTRY_NAME, self.model.state_dict(), self.config)
+        return self.version
+    
+    def compress(self, text, quality_factor=0.8):
+        with torch.no_grad():
+            encoded = self.model.encoder(text_to_tensor(text, self.vocab))
+        # Coarse settings fit in 4 bits per latent value
+        bits = 8 if quality_factor >= 0.5 else 4
+        return pack_latent(encoded.numpy(), bits, {
+            'quality': quality_factor,
+            'original_length': len(text)
+        }, model_version=self.version, config_hash=self.config_hash)
+    
+    def decompress(self, payload):
+        latent, metadata = unpack_latent(payload)
+        if metadata['model_version'] != self.version or metadata['config_hash'] != self.config_hash:
+            raise IncompatibleModelError(
+                f"Payload was produced by model v{metadata['model_version']}; this is v{self.version}"
+            )
+        with torch.no_grad():
+            decoded = self.model.decoder(torch.from_numpy(latent))
+        return tensor_to_text(decoded, self.vocab)
+
+# --- Windowed Codec (k characters -> one latent vector) ---
+WINDOWED_REGISTRY_NAME = 'windowed_text_autoencoder'
+
+class WindowedTextAutoencoder(nn.Module):
+    """Convolutional autoencoder over blocks of `window` characters
+    
+    Each block of characters is embedded and reduced by a strided
+    convolution to one latent vector, so the latent can use the context
+    inside the block; the decoder expands it back to per-character logits.
+    """
+    
+    def __init__(self, vocab_size, window=16, latent_dim=16, embed_dim=32, hidden_dim=256):
+        super(WindowedTextAutoencoder, self).__init__()
+        self.vocab_size = vocab_size
+        self.window = window
+        self.latent_dim = latent_dim
+        self.embed_dim = embed_dim
+        self.hidden_dim = hidden_dim
+        
+        self.embedding = nn.Embedding(vocab_size, embed_dim)
+        self.encoder = nn.Sequential(
+            nn.Conv1d(embed_dim, hidden_dim, kernel_size=window, stride=window),
+            nn.ReLU(),
+            nn.Conv1d(hidden_dim, latent_dim, kernel_size=1),
+            nn.Tanh()  # Bounded latent for fixed-width quantization
+        )
+        self.decoder = nn.Sequential(
+            nn.ConvTranspose1d(latent_dim, hidden_dim, kernel_size=window, stride=window),
+            nn.ReLU(),
+            nn.Conv1d(hidden_dim, vocab_size, kernel_size=1)  # Logits per character
+        )
+    
+    def encode(self, indices):
+        """(batch, length) indices -> (batch, length // window, latent_dim)"""
+        return self.encoder(self.embedding(indices).transpose(1, 2)).transpose(1, 2)
+    
+    def decode(self, latent):
+        """(batch, blocks, latent_dim) -> (batch, blocks * window, vocab_size) logits"""
+        return self.decoder(latent.transpose(1, 2)).transpose(1, 2)
+    
+    def forward(self, indices, noise=0.0):
+        latent = self.encode(indices)
+        if noise:
+            # Uniform noise of one quantization step stands in for rounding
+            latent = latent + (torch.rand_like(latent) - 0.5) * noise
+        return self.decode(latent), latent
+
+def train_windowed(corpus, vocab=None, window=16, latent_dim=16, bits=4, steps=3000,
+                   batch_size=64, blocks=8, lr=0.003, verbose=True):
+    """Fit a WindowedTextAutoencoder on a corpus; returns (model, vocab)"""
+    vocab = vocab or corpus_vocab(corpus)
+    model = WindowedTextAutoencoder(len(vocab), window, latent_dim)
+    indices = torch.from_numpy(vocab_indices(corpus, vocab)).clamp(min=0)
+    length = window * blocks
+    if len(indices) < length:
+        indices = indices.repeat(length // max(1, len(indices)) + 1)
+    step_size = 2.0 / ((1 << bits) - 1)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = nn.CrossEntropyLoss()
+    
+    model.train()
+    for step in range(steps):
+        starts = torch.randint(len(indices) - length + 1, (batch_size,))
+        batch = indices[starts.unsqueeze(1) + torch.arange(length)]
+        logits, _ = model(batch, noise=step_size)
+        loss = loss_fn(logits.reshape(-1, len(vocab)), batch.reshape(-1))
+        
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        
+        if verbose and (step + 1) % 500 == 0:
+            print(f"Step {step+1}/{steps}, Loss: {loss.item():.6f}")
+    
+    return model.eval(), vocab
+
+class WindowedTextCodec:
+    """Inference-only codec around a registered WindowedTextAutoencoder"""
+    
+    def __init__(self, model, vocab, bits=4, version=0):
+        self.model = model.eval()
+        self.vocab = list(vocab)
+        self.bits = bits
+        self.config = {
+            'vocab': ''.join(self.vocab),
+            'window': model.window,
+            'latent_dim': model.latent_dim,
+            'embed_dim': model.embed_dim,
+            'hidden_dim': model.hidden_dim,
+            'bits': bits
+        }
+        self.config_hash = config_hash(self.config)
+        self.version = version
+    
+    @classmethod
+    def load(cls, registry_dir='models', version=None):
+        arrays, info = ModelRegistry(registry_dir).load(WINDOWED_REGISTRY_NAME, version)
+        config = info['config']
+        vocab = list(config['vocab'])
+        model = WindowedTextAutoencoder(len(vocab), config['window'], config['latent_dim'],
+                                        config['embed_dim'], config['hidden_dim'])
+        model.load_state_dict({k: torch.from_numpy(v) for k, v in arrays.items()}, assign=True)
+        return cls(model, vocab, config['bits'], info['version'])
+    
+    def save(self, registry_dir='models'):
+        self.version = ModelRegistry(registry_dir).save(WINDOWED_REGISTRY_NAME, self.model.state_dict(), self.config)
+        return self.version
+    
+    def compress(self, text, quality_factor=None):
+        # Without a quality factor latents use the width the model was trained
+        # for; otherwise, as in PretrainedTextCodec, below 0.5 means 4 bits
+        bits = self.bits if quality_factor is None else (8 if quality_factor >= 0.5 else 4)
+        metadata = {'original_length': len(text)}
+        if quality_factor is not None:
+            metadata['quality'] = quality_factor
+        if not text:
+            # No block to encode: an empty latent
+            latent = np.zeros((0, self.model.latent_dim), dtype=np.float32)
+            return pack_latent(latent, bits, metadata, model_version=self.version,
+                               config_hash=self.config_hash)
+        # Unknown characters fall back to vocab[0]; the tail is padded to a whole block
+        indices = torch.from_numpy(vocab_indices(text, self.vocab)).clamp(min=0)
+        padding = -len(indices) % self.model.window
+        indices = torch.cat([indices, torch.zeros(padding, dtype=torch.long)])
+        with torch.no_grad():
+            latent = self.model.encode(indices.unsqueeze(0))[0]
+        return pack_latent(latent.numpy(), bits, metadata, model_version=self.version,
+                           config_hash=self.config_hash)
+    
+    def decompress(self, payload):
+        latent, metadata = unpack_latent(payload)
+        if metadata['model_version'] != self.version or metadata['config_hash'] != self.config_hash:
+            raise IncompatibleModelError(
+                f"Payload was produced by model v{metadata['model_version']}; this is v{self.version}"
+            )
+        if latent.shape[0] == 0:
+            return ''
+        with torch.no_grad():
+            logits = self.model.decode(torch.from_numpy(latent).unsqueeze(0))[0]
+        return tensor_to_text(logits[:metadata['original_length']], self.vocab)
+
+def bits_per_character(codec, texts):
+    """Measured size of the codec output against UTF-8, in bits per character
+    
+    bpc counts every payload byte (header included); latent_bpc only the
+    packed latent codes; entropy_bpc is the zero-order entropy of those
+    codes, i.e. what an entropy coder on top would approach. Raises
+    ValueError if texts holds no characters at all.
+    """
+    texts = list(texts)
+    if not any(texts):
+        raise ValueError("No text to measure")
+    chars = payload_bits = header_bits = correct = 0
+    utf8_bits = 0
+    counts = np.zeros(256, dtype=np.int64)
+    for text in texts:
+        payload = codec.compress(text)
+        decoded = codec.decompress(payload)
+        latent, metadata = unpack_latent(payload)
+        
+        chars += len(text)
+        utf8_bits += 8 * len(text.encode('utf-8'))
+        payload_bits += 8 * len(payload)
+        code_bytes = -(-latent.size * metadata['bits'] // 8)
+        header_bits += 8 * (len(payload) - code_bytes)
+        correct += sum(a == b for a, b in zip(text, decoded))
+        # Histogram of the quantized codes
+        step = metadata['scale']
+        codes = np.rint(latent / step).astype(np.int64) + metadata['zero_point']
+        counts += np.bincount(codes.ravel(), minlength=256)[:256]
+    
+    probabilities = counts[counts > 0] / counts.sum()
+    entropy = -(probabilities * np.log2(probabilities)).sum()
+    return {
+        'characters': chars,
+        'utf8_bpc': round(utf8_bits / chars, 4),
+        'bpc': round(payload_bits / chars, 4),
+        'latent_bpc': round((payload_bits - header_bits) / chars, 4),
+        'entropy_bpc': round(entropy * counts.sum() / chars, 4),
+        'accuracy': round(correct / chars, 4)
+    }
+
 # --- Main Program ---
 def main():
     print("=== Lossy Neural Codec for Text Compression ===\n")
@@ -209,7 +471,20 @@ def main():
             print("Invalid input, using medium quality (0.7)")
     
     print(f"\nUsing quality factor: {quality_factor}")
-    
+
+    # A corpus model from train_neuraltext.py needs no training per input
+    if ModelRegistry('models').latest(REGISTRY_NAME):
+        codec = PretrainedTextCodec.load('models')
+        payload = codec.compress(text, quality_factor)
+        decompressed_text = codec.decompress(payload)
+        accuracy = sum(1 for a, b in zip(text, decompressed_text) if a == b) / len(text)
+        print(f"\nPretrained model v{codec.version}")
+        print(f"Decompressed:       {decompressed_text}")
+        print(f"Original size:      {len(text.encode('utf-8')):,} bytes")
+        print(f"Compressed size:    {len(payload):,} bytes")
+        print(f"Character accuracy: {accuracy*100:.1f}%")
+        return
+
     # Create vocabulary and model
     vocab = sorted(set(text))
     print(f"Vocabulary size: {len(vocab)} unique characters")
@@ -222,6 +497,11 @@ def main():
     print(f"\nTraining neural codec (compression ratio: {compression_ratio}:1)...")
     model = train_model_on_text(model, text, vocab)
     
+    # Serve from an INT8 TorchScript copy, checked against the trained model
+    model, report = optimize_and_report(model, text_to_tensor(text, vocab))
+    print(f"INT8 TorchScript model: {report['speedup']}x faster, "
+          f"{report['argmax_agreement']*100:.1f}% identical characters")
+    
     # Compress
     print("\nCompressing...")
     compressed_data = compress_neural_lossy(text, model, vocab, quality_factor)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from compression import huffman
+from compression.huffman import HEADER, LENGTHS_SIZE, huffman_encode, huffman_decode
+
+# Small lanes and chunks put many lane and chunk boundaries inside short
+# inputs, so the resynchronization walk runs for every test case
+BOUNDARY_SIZES = [(16, 64), (24, 200), (64, 1024), (huffman.LANE_BITS, huffman.DECODE_CHUNK_BITS)]
+
+
+def random_inputs(seed=0):
+    rng = np.random.RandomState(seed)
+    for size in (1, 2, 3, 7, 100, 4096):
+        yield rng.randint(0, 256, size)                                  # flat, 8-bit codes
+        yield rng.zipf(1.2 + rng.rand(), size).clip(0, 255)              # skewed, long codes
+        yield rng.randint(0, rng.randint(2, 6), size)                    # tiny alphabet
+        yield rng.choice(rng.randint(0, 256, 40), size)                  # sparse alphabet
+
+
+@pytest.mark.parametrize('lane_bits, chunk_bits', BOUNDARY_SIZES)
+def test_round_trip_random_alphabets(monkeypatch, lane_bits, chunk_bits):
+    monkeypatch.setattr(huffman, 'LANE_BITS', lane_bits)
+    monkeypatch.setattr(huffman, 'DECODE_CHUNK_BITS', chunk_bits)
+    for symbols in random_inputs():
+        data = symbols.astype(np.uint8).tobytes()
+        assert huffman_decode(huffman_encode(data)) == data
+
+
+def test_round_trip_text_and_empty():
+    text = "Huffman codes resynchronize within a few symbols. " * 200
+    assert huffman_decode(huffman_encode(text)) == text.encode('utf-8')
+    assert huffman_decode(huffman_encode(b'')) == b''
+
+
+@pytest.mark.parametrize('size', [1, 9, 1000])
+def test_single_symbol(size):
+    data = b'x' * size
+    assert huffman_decode(huffman_encode(data)) == data
+
+
+def test_crosses_decode_chunk():
+    # More than DECODE_CHUNK_BITS of payload at the real lane and chunk sizes
+    rng = np.random.RandomState(1)
+    data = rng.zipf(1.5, huffman.DECODE_CHUNK_BITS // 3).clip(0, 255).astype(np.uint8).tobytes()
+    blob = huffman_encode(data)
+    assert (len(blob) - HEADER.size - LENGTHS_SIZE) * 8 > huffman.DECODE_CHUNK_BITS
+    assert huffman_decode(blob) == data
+
+
+def test_truncated_blob_raises_value_error():
+    blob = huffman_encode(b'abracadabra' * 50)
+    for cut in (0, 1, HEADER.size - 1, HEADER.size, HEADER.size + LENGTHS_SIZE - 1, len(blob) - 1):
+        with pytest.raises(ValueError):
+            huffman_decode(blob[:cut])
+
+
+def test_corrupt_blob_raises_value_error():
+    blob = bytearray(huffman_encode(b'abracadabra' * 50))
+    # Over-subscribed code lengths: two 1-bit codes plus more
+    blob[HEADER.size:HEADER.size + 2] = bytes([0x11, 0x10])
+    with pytest.raises(ValueError):
+        huffman_decode(bytes(blob))
+    # A symbol count the payload cannot hold
+    with pytest.raises(ValueError):
+        huffman_decode(HEADER.pack(10 ** 9) + bytes(huffman_encode(b'abc'))[HEADER.size:])
+
+
+def test_corruption_never_raises_other_errors():
+    rng = np.random.RandomState(2)
+    data = rng.zipf(1.3, 3000).clip(0, 255).astype(np.uint8).tobytes()
+    blob = huffman_encode(data)
+    for _ in range(200):
+        corrupt = bytearray(blob)
+        for at in rng.randint(0, len(blob), rng.randint(1, 5)):
+            corrupt[at] = rng.randint(256)
+        try:
+            huffman_decode(bytes(corrupt))
+        except ValueError:
+            pass
@@ -0,0 +1,106 @@
+import argparse
+import json
+import sys
+import time
+from neuraltext import (LossyTextAutoencoder, PretrainedTextCodec, train_on_corpus,
+                        WindowedTextCodec, train_windowed, bits_per_character,
+                        train_model_on_text, compress_neural_lossy, decompress_neural_lossy)
+
+# Train the LossyTextAutoencoder once on a corpus and register it:
+#
+#   python train_neuraltext.py corpus.txt --registry models
+#
+# and compare the per-call cost with the old train-per-input flow:
+#
+#   python train_neuraltext.py corpus.txt --registry models --benchmark 20
+#
+# --window K trains the convolutional codec instead (K characters per
+# latent vector); the benchmark then also reports bits per character.
+
+
+def char_accuracy(original, decoded):
+    if not original:
+        return 1.0
+    return sum(a == b for a, b in zip(original, decoded)) / len(original)
+
+
+def benchmark(codec, samples, quality_factor=0.8, epochs=300):
+    """Per-call latency and accuracy: pretrained inference vs train-per-input"""
+    results = {'pretrained': {'seconds': 0.0, 'accuracy': 0.0, 'bytes': 0},
+               'train_per_input': {'seconds': 0.0, 'accuracy': 0.0, 'bytes': 0}}
+
+    for text in samples:
+        start = time.perf_counter()
+        payload = codec.compress(text, quality_factor)
+        decoded = codec.decompress(payload)
+        results['pretrained']['seconds'] += time.perf_counter() - start
+        results['pretrained']['accuracy'] += char_accuracy(text, decoded)
+        results['pretrained']['bytes'] += len(payload)
+
+        # The flow of neuraltext.main: new vocab and model for every input
+        start = time.perf_counter()
+        vocab = sorted(set(text))
+        model = LossyTextAutoencoder(len(vocab), hidden_dim=64, compression_ratio=4)
+        model = train_model_on_text(model, text, vocab, epochs=epochs, verbose=False)
+        payload = compress_neural_lossy(text, model, vocab, quality_factor)
+        decoded = decompress_neural_lossy(payload, model)
+        results['train_per_input']['seconds'] += time.perf_counter() - start
+        results['train_per_input']['accuracy'] += char_accuracy(text, decoded)
+        results['train_per_input']['bytes'] += len(payload.encode('utf-8'))
+
+    for entry in results.values():
+        entry['ms_per_call'] = round(entry.pop('seconds') * 1000 / len(samples), 3)
+        entry['accuracy'] = round(entry['accuracy'] / len(samples), 4)
+        entry['bytes_per_char'] = round(entry.pop('bytes') / sum(map(len, samples)), 3)
+    results['speedup'] = round(results['train_per_input']['ms_per_call'] /
+                               results['pretrained']['ms_per_call'], 1)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and register a corpus-level LossyTextAutoencoder")
+    parser.add_argument('corpus', help="UTF-8 text file")
+    parser.add_argument('--registry', default='models', help="model registry directory")
+    parser.add_argument('--hidden-dim', type=int, default=64)
+    parser.add_argument('--compression-ratio', type=int, default=4)
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--quality', type=float, default=0.8)
+    parser.add_argument('--window', type=int, default=0,
+                        help="train the windowed codec with this many characters per latent (0: per character)")
+    parser.add_argument('--latent-dim', type=int, default=16, help="windowed codec latent size")
+    parser.add_argument('--bits', type=int, default=4, choices=(4, 8), help="windowed codec bits per latent value")
+    parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                        help="after training, benchmark on the first N non-empty corpus lines")
+    parser.add_argument('--skip-training', action='store_true', help="benchmark the latest registered model")
+    args = parser.parse_args(argv)
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        corpus = f.read()
+
+    if args.window:
+        if args.skip_training:
+            codec = WindowedTextCodec.load(args.registry)
+        else:
+            model, vocab = train_windowed(corpus, window=args.window, latent_dim=args.latent_dim,
+                                          bits=args.bits, steps=args.steps)
+            codec = WindowedTextCodec(model, vocab, args.bits)
+            codec.save(args.registry)
+            print(f"Registered {codec.config_hash} as version {codec.version} ({len(vocab)} characters)")
+    elif args.skip_training:
+        codec = PretrainedTextCodec.load(args.registry)
+    else:
+        model, vocab = train_on_corpus(corpus, hidden_dim=args.hidden_dim,
+                                       compression_ratio=args.compression_ratio, steps=args.steps)
+        codec = PretrainedTextCodec(model, vocab)
+        codec.save(args.registry)
+        print(f"Registered {codec.config_hash} as version {codec.version} ({len(vocab)} characters)")
+
+    if args.benchmark:
+        samples = [line for line in corpus.splitlines() if line.strip()][:args.benchmark]
+        print(json.dumps(bits_per_character(codec, samples), indent=2))
+        print(json.dumps(benchmark(codec, samples, args.quality), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """Collect concurrent calls into batches for one vectorized call
+
+    submit() returns a Future. A worker thread waits for the first request,
+    then keeps collecting for up to max_wait_ms or until max_batch_size
+    requests are queued, calls batch_fn(list_of_items) once and hands each
+    caller its own element of the returned list. If the batched call
+    raises, each item is retried on its own, so one bad request only fails
+    its own caller; if it returns a list of the wrong length, every caller
+    in the batch gets a RuntimeError.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self.stats = {'batches': 0, 'items': 0, 'retried_batches': 0}
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        if self._closed:
+            raise RuntimeError("Batcher is closed")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        """Blocking helper: submit and wait for the result"""
+        return self.submit(item).result()
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            self.stats['batches'] += 1
+            self.stats['items'] += len(batch)
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    self.stats['retried_batches'] += 1
+                    self._run_singly(batch)
+                continue
+            results = list(results)
+            if len(results) != len(batch):
+                # Never leave a caller waiting on a future nobody resolves
+                error = RuntimeError(f"batch_fn returned {len(results)} results "
+                                     f"for {len(batch)} items")
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run_singly(self, batch):
+        """Call batch_fn once per item, failing only the items that raise"""
+        for item, future in batch:
+            try:
+                result = self.batch_fn([item])[0]
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+class BatchedNeuralCodec:
+    """Drop-in NeuralCodec front end that batches concurrent requests"""
+
+    def __init__(self, codec, max_batch_size=16, max_wait_ms=5):
+        self.codec = codec
+        self._compress = MicroBatcher(self._compress_batch, max_batch_size, max_wait_ms)
+        self._decompress = MicroBatcher(codec.decompress_batch, max_batch_size, max_wait_ms)
+
+    def _compress_batch(self, requests):
+        texts, levels, qualities = zip(*requests)
+        return self.codec.compress_batch(texts, levels, qualities)
+
+    def compress(self, text, compression_level=0.5, quality=0.8):
+        return self._compress((text, compression_level, quality))
+
+    def decompress(self, compressed_data):
+        # Reject foreign payloads here so they cannot fail a whole batch
+        self.codec.check_payload(compressed_data)
+        return self._decompress(compressed_data)
+
+    def get_stats(self):
+        return {
+            'compress': dict(self._compress.stats),
+            'decompress': dict(self._decompress.stats)
+        }
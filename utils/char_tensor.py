@@ -0,0 +1,42 @@
+import numpy as np
+import torch
+
+# Vectorized conversions between text and one-hot character tensors.
+# Characters are looked up through a code point -> index table, so there is
+# no per-character Python work beyond a single encode() of the text.
+
+
+def _code_points(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+
+
+def vocab_indices(text, vocab):
+    """int64 array with the vocab index of every character, -1 if absent"""
+    codes = _code_points(text)
+    if not len(vocab) or not codes.size:
+        return np.full(codes.size, -1, dtype=np.int64)
+    vocab_codes = _code_points(''.join(vocab))
+    table = np.full(int(vocab_codes.max()) + 1, -1, dtype=np.int64)
+    # Reversed so the first occurrence wins, like list.index
+    table[vocab_codes[::-1]] = np.arange(len(vocab) - 1, -1, -1)
+    indices = np.full(codes.size, -1, dtype=np.int64)
+    known = codes < table.size
+    indices[known] = table[codes[known]]
+    return indices
+
+
+def one_hot(indices, size):
+    """(len(indices), size) float tensor; rows of negative indices stay zero"""
+    indices = torch.as_tensor(indices, dtype=torch.long)
+    valid = indices >= 0
+    out = torch.zeros(len(indices), size)
+    out.scatter_(1, indices.clamp(min=0).unsqueeze(1), valid.float().unsqueeze(1))
+    return out
+
+
+def argmax_text(tensor, vocab):
+    """Most likely character of every row, joined into a string"""
+    indices = torch.argmax(tensor, dim=-1).cpu().numpy()
+    # Single-character vocab: a '<U1' array is already a UTF-32 buffer
+    chars = np.array(list(vocab), dtype='<U1')
+    return chars[indices].tobytes().decode('utf-32-le')
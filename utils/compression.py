@@ -1,12 +1,12 @@
-import pywt
 import numpy as np
 from PIL import Image
-import cv2
-import tensorflow as tf
-import heapq
-from collections import defaultdict
 import os
 import time
+from utils.lazy import LazyResource
+from utils.dct_utils import dct_compress
+from compression.rate_control import search_quality
+from compression.image_io import is_path, open_image, save_image, write_bytes, source_size, output_size
+from compression.huffman import huffman_encode, huffman_decode, codes_as_strings, read_code_lengths
 
 def allowed_file(filename, allowed_extensions):
     """Check if file has allowed extension"""
@@ -41,92 +41,23 @@ def format_file_size(size_bytes):
     
     return f"{size_bytes:.2f} {size_names[i]}"
 # metode hufman coding
-class HuffmanNode:
-    def __init__(self, char=None, freq=0, left=None, right=None):
-        self.char = char
-        self.freq = freq
-        self.left = left
-        self.right = right
-    
-    def __lt__(self, other):
-        return self.freq < other.freq
-
-def build_frequency_table(text):
-    frequency = defaultdict(int)
-    for char in text:
-        frequency[char] += 1
-    return frequency
-
-def build_huffman_tree(frequency):
-    heap = []
-    for char, freq in frequency.items():
-        heapq.heappush(heap, HuffmanNode(char=char, freq=freq))
-    
-    while len(heap) > 1:
-        left = heapq.heappop(heap)
-        right = heapq.heappop(heap)
-        merged = HuffmanNode(freq=left.freq + right.freq, left=left, right=right)
-        heapq.heappush(heap, merged)
-    
-    return heapq.heappop(heap)
-
-def build_codes(root, current_code="", codes={}):
-    if root is None:
-        return
-    
-    if root.char is not None:
-        codes[root.char] = current_code or "0"  # Handle single character case
-        return
-    
-    build_codes(root.left, current_code + "0", codes)
-    build_codes(root.right, current_code + "1", codes)
-    
-    return codes
-
-def encode_text(text, codes):
-    encoded_text = ""
-    for char in text:
-        encoded_text += codes[char]
-    return encoded_text
-
-def pad_encoded_text(encoded_text):
-    extra_padding = 8 - len(encoded_text) % 8
-    for i in range(extra_padding):
-        encoded_text += "0"
-    
-    padded_info = "{0:08b}".format(extra_padding)
-    encoded_text = padded_info + encoded_text
-    return encoded_text
-
-def get_byte_array(padded_encoded_text):
-    if len(padded_encoded_text) % 8 != 0:
-        raise ValueError("Encoded text not padded properly")
-    
-    b = bytearray()
-    for i in range(0, len(padded_encoded_text), 8):
-        byte = padded_encoded_text[i:i+8]
-        b.append(int(byte, 2))
-    return b
-
 def huffman_compress(text):
     if not text:
-        return {'compressed': '', 'codes': {}}
+        return {'compressed': b'', 'codes': {}}
     
-    frequency = build_frequency_table(text)
-    root = build_huffman_tree(frequency)
-    codes = build_codes(root)
-    
-    encoded_text = encode_text(text, codes)
-    padded_encoded_text = pad_encoded_text(encoded_text)
-    byte_array = get_byte_array(padded_encoded_text)
-   
-    compressed = ''.join([bin(byte)[2:].rjust(8, '0') for byte in byte_array])
+    compressed = huffman_encode(text)
+    codes = codes_as_strings(read_code_lengths(compressed))
     
     return {
         'compressed': compressed,
         'codes': codes
     }
 
+def huffman_decompress(compressed):
+    if not compressed:
+        return ''
+    return huffman_decode(compressed).decode('utf-8')
+
 def compress_text(text, algorithm='huffman'):
     """Compress text using the specified algorithm"""
     if algorithm.lower() != 'huffman':
@@ -138,7 +69,7 @@ def compress_text(text, algorithm='huffman'):
     
     compressed_data = result['compressed']
     original_size = len(text.encode('utf-8'))
-    compressed_size = len(compressed_data.encode('utf-8'))
+    compressed_size = len(compressed_data)
     
     return {
         'compressed': compressed_data,
@@ -149,26 +80,10 @@ def compress_text(text, algorithm='huffman'):
         'compression_ratio': format_compression_ratio(original_size, compressed_size)
     }
 
-def dwt_compress(input_path, output_path, quality=85, wavelet='haar', level=3):
-    img = Image.open(input_path).convert('L')
-    img_array = np.array(img, dtype=np.float32) / 255.0
-    
-    coeffs = pywt.wavedec2(img_array, wavelet, level=level)
-    
-    threshold = (100 - quality) / 100.0
-    coeffs_thresh = [coeffs[0]]
-    for i in range(1, len(coeffs)):
-        coeffs_thresh.append(tuple(
-            pywt.threshold(c, threshold, mode='soft') for c in coeffs[i]
-        ))
-    
-    reconstructed = pywt.waverec2(coeffs_thresh, wavelet)
-    reconstructed = np.clip(reconstructed, 0, 1)
-    
-    compressed_img = (reconstructed * 255).astype(np.uint8)
-    Image.fromarray(compressed_img).save(output_path)
-
 def build_autoencoder():
+    # TensorFlow is only needed for the DNN codec, so import it on first use
+    import tensorflow as tf
+    
     input_img = tf.keras.layers.Input(shape=(256, 256, 1))
     
     x = tf.keras.layers.Conv2D(32, (3, 3), activation='relu', padding='same')(input_img)
@@ -186,77 +101,79 @@ def build_autoencoder():
     autoencoder.compile(optimizer='adam', loss='binary_crossentropy')
     return autoencoder
 
-autoencoder = None
+autoencoder = LazyResource(build_autoencoder, 'autoencoder')
 
-def dnn_compress(input_path, output_path, quality=85):
-    global autoencoder
-    if autoencoder is None:
-        autoencoder = build_autoencoder()
+def dnn_compress(input_path, output_path=None, quality=85, format=None):
+    # Paths, bytes and file objects in and out; output_path=None returns bytes
+    model = autoencoder.get()
     
-    img = Image.open(input_path).convert('L')
+    img = open_image(input_path).convert('L')
     img = img.resize((256, 256))
     img_array = np.array(img, dtype=np.float32) / 255.0
     img_array = np.expand_dims(img_array, axis=-1)
     img_array = np.expand_dims(img_array, axis=0)
     
-    compressed = autoencoder.predict(img_array)
+    compressed = model.predict(img_array)
     compressed = np.clip(compressed * (quality / 100.0), 0, 1)
     
     compressed_img = (compressed[0,:,:,0] * 255).astype(np.uint8)
-    Image.fromarray(compressed_img).save(output_path)
+    return save_image(Image.fromarray(compressed_img), output_path, format)
 
-def dct_compress(input_path, output_path, quality=85):
-    img = cv2.imread(input_path, cv2.IMREAD_GRAYSCALE)
-    if img is None:
-        raise ValueError("Could not read image")
-    
-    img = img.astype(np.float32) / 255.0
-    
-    h, w = img.shape
-    pad_h = (8 - h % 8) % 8
-    pad_w = (8 - w % 8) % 8
-    
-    if pad_h > 0 or pad_w > 0:
-        img = np.pad(img, ((0, pad_h), (0, pad_w)), mode='constant')
-    
-    compressed = np.zeros_like(img)
-    for i in range(0, img.shape[0], 8):
-        for j in range(0, img.shape[1], 8):
-            block = img[i:i+8, j:j+8]
-            dct_block = cv2.dct(block)
-            
-            threshold = (100 - quality) / 100.0 * np.max(np.abs(dct_block))
-            dct_block[np.abs(dct_block) < threshold] = 0
-            
-            compressed[i:i+8, j:j+8] = cv2.idct(dct_block)
-    
-    compressed = np.clip(compressed, 0, 1)
-    compressed_img = (compressed * 255).astype(np.uint8)
-    Image.fromarray(compressed_img).save(output_path)
+def dct_jpeg(img, quality):
+    """The 'jpeg' algorithm as a rate-control encoder: DCT codec, JPEG bytes"""
+    return dct_compress(img, None, quality, format='JPEG')
+
+def compress_image(input_path, output_path=None, algorithm='jpeg', quality=85,
+                   target_bytes=None, target_ssim=None):
+    """Compress image using the specified algorithm
 
-def compress_image(input_path, output_path, algorithm='jpeg', quality=85):
-    """Compress image using the specified algorithm"""
+    input_path and output_path may also be bytes / file objects; with
+    output_path=None nothing is written and the result carries the encoded
+    image under 'data'.
+
+    With target_bytes and/or target_ssim, jpeg and webp search for the
+    quality (in-memory encodes through the same codec as without targets)
+    and the result also reports the chosen quality and the number of
+    encodes. png is lossless and takes no targets (ValueError).
+    """
     start_time = time.time()
-    
-    if algorithm.lower() == 'jpeg':
-        dct_compress(input_path, output_path, quality)
-    elif algorithm.lower() == 'png':
-        img = Image.open(input_path)
-        img.save(output_path, optimize=True, quality=quality)
-    elif algorithm.lower() == 'webp':
-        img = Image.open(input_path)
-        img.save(output_path, format='WEBP', quality=quality)
+    search = None
+    algorithm = algorithm.lower()
+    # Without a file name the format comes from the algorithm
+    format = None if is_path(output_path) else {'jpeg': 'JPEG', 'png': 'PNG', 'webp': 'WEBP'}.get(algorithm)
+    
+    original_size = source_size(input_path)
+    
+    if target_bytes is not None or target_ssim is not None:
+        if algorithm not in ('jpeg', 'webp'):
+            raise ValueError(f"{algorithm} does not support target_bytes / target_ssim")
+        search = search_quality(open_image(input_path), algorithm, target_bytes, target_ssim,
+                                encoder=dct_jpeg if algorithm == 'jpeg' else None)
+        output = write_bytes(search.pop('data'), output_path)
+    elif algorithm == 'jpeg':
+        output = dct_compress(input_path, output_path, quality, format=format)
+    elif algorithm == 'png':
+        output = save_image(open_image(input_path), output_path, format, optimize=True)
+    elif algorithm == 'webp':
+        output = save_image(open_image(input_path), output_path, format, quality=quality)
     else:
         raise ValueError(f"Unsupported algorithm: {algorithm}")
     
     end_time = time.time()
     
-    original_size = get_file_size(input_path)
-    compressed_size = get_file_size(output_path)
+    compressed_size = output_size(output_path, output)
     
-    return {
+    result = {
         'original_size': original_size,
         'compressed_size': compressed_size,
         'compression_ratio': format_compression_ratio(original_size, compressed_size),
         'compression_time': round(end_time - start_time, 4)
-    }
\ No newline at end of file
+    }
+    if search is not None:
+        result.update(quality=search['quality'], encodes=search['encodes'],
+                      target_met=search['met'], cached=search['cached'])
+        if 'ssim' in search:
+            result['ssim'] = search['ssim']
+    if output_path is None:
+        result['data'] = output
+    return result
\ No newline at end of file
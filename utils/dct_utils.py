@@ -1,37 +1,22 @@
-import cv2
-import numpy as np
-from PIL import Image
-from io import BytesIO
+from compression.dct import compress_plane
+from compression.color import split_planes, merge_planes, map_planes
+from compression.container import encode_file
+from compression.image_io import is_path, open_image, save_image
 
-def dct_compress(input_path, output_path, quality=85):
-    img = cv2.imread(input_path, cv2.IMREAD_GRAYSCALE)
-    if img is None:
-        raise ValueError("Could not read image")
-    
-    img = img.astype(np.float32) / 255.0
-    
-   
-    h, w = img.shape
-    pad_h = (8 - h % 8) % 8
-    pad_w = (8 - w % 8) % 8
-    
-    if pad_h > 0 or pad_w > 0:
-        img = np.pad(img, ((0, pad_h), (0, pad_w)), mode='constant')
-    
+def dct_compress(input_path, output_path=None, quality=85, color=True, subsample=False, format=None):
+    # Paths, bytes and file objects are accepted; output_path=None returns the
+    # encoded bytes (format, default PNG, applies to file objects and bytes)
 
-    compressed = np.zeros_like(img)
-    for i in range(0, img.shape[0], 8):
-        for j in range(0, img.shape[1], 8):
-            block = img[i:i+8, j:j+8]
-            dct_block = cv2.dct(block)
-            
-       
-            threshold = (100 - quality) / 100.0 * np.max(np.abs(dct_block))
-            dct_block[np.abs(dct_block) < threshold] = 0
-            
-            compressed[i:i+8, j:j+8] = cv2.idct(dct_block)
-    
+    # .dctc output stores the quantized coefficients themselves
+    if is_path(output_path) and str(output_path).lower().endswith('.dctc'):
+        encode_file(input_path, output_path, quality, color=color, subsample=subsample)
+        return output_path
 
-    compressed = np.clip(compressed, 0, 1)
-    compressed_img = (compressed * 255).astype(np.uint8)
-    Image.fromarray(compressed_img).save(output_path)
\ No newline at end of file
+    img = open_image(input_path)
+    if not color:
+        img = img.convert('L')
+
+    # Colour images are coded in YCbCr (optionally 4:2:0), planes in parallel
+    planes = split_planes(img, subsample)
+    planes = map_planes(lambda plane: compress_plane(plane, quality), planes)
+    return save_image(merge_planes(planes), output_path, format)
@@ -1,8 +1,11 @@
-import tensorflow as tf
 import numpy as np
+from utils.lazy import LazyResource
 from PIL import Image
 
 def build_autoencoder():
+    # TensorFlow is only needed for the DNN codec, so import it on first use
+    import tensorflow as tf
+    
     input_img = tf.keras.layers.Input(shape=(256, 256, 1))
     
     # Encoder
@@ -22,14 +25,12 @@ def build_autoencoder():
     autoencoder.compile(optimizer='adam', loss='binary_crossentropy')
     return autoencoder
 
-# Global model instance
-autoencoder = None
+# Global model instance, built on first use
+autoencoder = LazyResource(build_autoencoder, 'autoencoder')
 
 def dnn_compress(input_path, output_path, quality=85):
-    global autoencoder
-    if autoencoder is None:
-        autoencoder = build_autoencoder()
-        # Load weights if available
+    model = autoencoder.get()
+    # Load weights if available
     
     img = Image.open(input_path).convert('L')
     img = img.resize((256, 256))
@@ -38,7 +39,7 @@ def dnn_compress(input_path, output_path, quality=85):
     img_array = np.expand_dims(img_array, axis=0)
     
     # Adjust compression strength based on quality
-    compressed = autoencoder.predict(img_array)
+    compressed = model.predict(img_array)
     compressed = np.clip(compressed * (quality / 100.0), 0, 1)
     
     # Save result
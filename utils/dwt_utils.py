@@ -1,25 +1,38 @@
-import pywt
-import numpy as np
-from PIL import Image
+from compression.color import split_planes, merge_planes, map_planes
+from compression.container import encode_file
+from compression.dwt import (LARGE_IMAGE_PIXELS, TILE_SIZE, image_pixels, threshold_plane,
+                             tiled_threshold_file)
+from compression.image_io import is_path, open_image, save_image
 
-def dwt_compress(input_path, output_path, quality=85, wavelet='haar', level=3):
-    img = Image.open(input_path).convert('L')
-    img_array = np.array(img, dtype=np.float32) / 255.0
-    
+def dwt_compress(input_path, output_path=None, quality=85, wavelet='haar', level=3,
+                 tile_size=None, shape=None, color=True, subsample=False, format=None):
+    # Paths, bytes and file objects are accepted; output_path=None returns the
+    # encoded bytes (format, default PNG, applies to file objects and bytes)
 
-    coeffs = pywt.wavedec2(img_array, wavelet, level=level)
+    # .dwtc output stores the quantized coefficients themselves
+    if is_path(output_path) and str(output_path).lower().endswith('.dwtc'):
+        encode_file(input_path, output_path, quality, color=color, wavelet=wavelet,
+                    level=level, subsample=subsample)
+        return output_path
 
-    threshold = (100 - quality) / 100.0
-    coeffs_thresh = [coeffs[0]]
-    for i in range(1, len(coeffs)):
-        coeffs_thresh.append(tuple(
-            pywt.threshold(c, threshold, mode='soft') for c in coeffs[i]
-        ))
-    
-    
-    reconstructed = pywt.waverec2(coeffs_thresh, wavelet)
-    reconstructed = np.clip(reconstructed, 0, 1)
-    
-    
-    compressed_img = (reconstructed * 255).astype(np.uint8)
-    Image.fromarray(compressed_img).save(output_path)
\ No newline at end of file
+    # Soft threshold in 0-255 pixel units
+    threshold = (100 - quality) / 100.0 * 255
+
+    # Large (or raw, shape=(h, w)) image files are processed tile by tile, as grayscale.
+    # Only .npy and raw inputs are read tile by tile; other formats are decoded whole
+    # by PIL (JPEG at one byte per pixel) and rejected above dwt.MAX_DECODE_BYTES
+    if is_path(input_path) and is_path(output_path):
+        if tile_size is None and (shape is not None or image_pixels(input_path) > LARGE_IMAGE_PIXELS):
+            tile_size = TILE_SIZE
+        if tile_size:
+            tiled_threshold_file(input_path, output_path, threshold, wavelet, level, tile_size, shape)
+            return output_path
+
+    img = open_image(input_path)
+    if not color:
+        img = img.convert('L')
+
+    # Colour images are coded in YCbCr (optionally 4:2:0), planes in parallel
+    planes = split_planes(img, subsample)
+    planes = map_planes(lambda plane: threshold_plane(plane, threshold, wavelet, level), planes)
+    return save_image(merge_planes(planes), output_path, format)
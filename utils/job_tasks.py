@@ -0,0 +1,67 @@
+import os
+from utils.jobs import report_progress
+
+# Long-running work for utils.jobs.JobQueue. Every function runs in a
+# worker process; heavy imports happen inside, and models are kept in module
+# globals so each worker loads them once. Return values must be picklable.
+#
+# Task results are dicts. 'payload' (bytes) and 'output_path' (a file the
+# web process can serve) have a meaning for /jobs/<id>/result.
+
+TASKS = {
+    'bert_compress': 'utils.job_tasks:bert_compress',
+    'dnn_compress': 'utils.job_tasks:dnn_compress',
+    'convert_document': 'utils.job_tasks:convert_document',
+}
+
+_neural_codecs = {}
+
+
+def _neural_codec(artifact_dir, registry_dir, version):
+    key = (artifact_dir, registry_dir, version)
+    if key not in _neural_codecs:
+        from utils.neural_codec import NeuralCodec
+        _neural_codecs[key] = NeuralCodec(artifact_dir=artifact_dir, registry_dir=registry_dir,
+                                          version=version)
+    return _neural_codecs[key]
+
+
+def bert_compress(text, compression_level=0.5, quality=0.8,
+                  artifact_dir=None, registry_dir=None, version=None):
+    """NeuralCodec (BERT) compression of one text"""
+    report_progress(0.1, 'loading model')
+    codec = _neural_codec(artifact_dir, registry_dir, version)
+    report_progress(0.5, 'compressing')
+    payload = codec.compress(text, compression_level=compression_level, quality=quality)
+    return {
+        'payload': payload,
+        'original_size': len(text.encode('utf-8')),
+        'compressed_size': len(payload),
+    }
+
+
+def dnn_compress(input_path, output_path, quality=85):
+    """Autoencoder image compression (utils.compression.dnn_compress)"""
+    report_progress(0.1, 'loading model')
+    from utils.compression import dnn_compress as compress, autoencoder
+    autoencoder.get()
+    report_progress(0.5, 'compressing')
+    compress(input_path, output_path, quality)
+    return {
+        'output_path': output_path,
+        'original_size': os.path.getsize(input_path),
+        'compressed_size': os.path.getsize(output_path),
+    }
+
+
+def convert_document(input_path, output_path, format='word'):
+    """Word/PDF conversion (utils.document_converter)"""
+    report_progress(0.1, 'converting')
+    from utils.document_converter import convert_to_word, convert_to_pdf
+    if format == 'word':
+        convert_to_word(input_path, output_path)
+    elif format == 'pdf':
+        convert_to_pdf(input_path, output_path)
+    else:
+        raise ValueError(f"Unsupported format: {format}")
+    return {'output_path': output_path, 'format': format}
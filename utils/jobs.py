@@ -0,0 +1,296 @@
+import importlib
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+CANCELLING = 'cancelling'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Set in every worker process by _init_worker
+_store = None
+_current_job = None
+
+
+class JobCancelled(Exception):
+    """Raised inside a task by report_progress once its job is cancelled"""
+
+
+class JobStore:
+    """Job table in a SQLite file, shared by every web and worker process
+
+    Each call opens its own connection, so a store can be used from any
+    thread and passed to spawned workers by path.
+    """
+
+    FIELDS = ('id', 'task', 'state', 'progress', 'message', 'error',
+              'submitted', 'started', 'finished')
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, task TEXT, state TEXT, progress REAL,
+                message TEXT, error TEXT, submitted REAL, started REAL,
+                finished REAL, files TEXT, result BLOB, cancel INTEGER DEFAULT 0)""")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, job_id, task, files=()):
+        with self._connect() as db:
+            db.execute("INSERT INTO jobs (id, task, state, progress, submitted, files) "
+                       "VALUES (?, ?, ?, 0.0, ?, ?)",
+                       (job_id, task, PENDING, time.time(), json.dumps(list(files))))
+
+    def get(self, job_id):
+        """Public view of a job (without its result), or None if unknown"""
+        with self._connect() as db:
+            row = db.execute(f"SELECT {', '.join(self.FIELDS)} FROM jobs WHERE id = ?",
+                             (job_id,)).fetchone()
+        return dict(zip(self.FIELDS, row)) if row else None
+
+    def result(self, job_id):
+        """(state, return value); KeyError if unknown, value None unless done"""
+        with self._connect() as db:
+            row = db.execute("SELECT state, result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        state, blob = row
+        return state, pickle.loads(blob) if state == DONE and blob is not None else None
+
+    def progress(self, job_id, fraction, message=None):
+        """Record progress; returns False if the job was cancelled"""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET state = ?, started = COALESCE(started, ?) "
+                       "WHERE id = ? AND state = ?", (RUNNING, time.time(), job_id, PENDING))
+            db.execute("UPDATE jobs SET progress = ?, message = COALESCE(?, message) "
+                       "WHERE id = ? AND state NOT IN (?, ?, ?)",
+                       (fraction, message, job_id) + FINISHED)
+            row = db.execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return not (row and row[0])
+
+    def finish(self, job_id, state, result=None, error=None):
+        """Move a job to a final state (a cancel request turns DONE into CANCELLED)"""
+        with self._connect() as db:
+            row = db.execute("SELECT cancel, state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[1] in FINISHED:
+                return
+            if row[0] and state == DONE:
+                state, result = CANCELLED, None
+            db.execute("UPDATE jobs SET state = ?, error = ?, finished = ?, result = ?, "
+                       "progress = CASE WHEN ? THEN 1.0 ELSE progress END WHERE id = ?",
+                       (state, error, time.time(),
+                        pickle.dumps(result) if state == DONE else None,
+                        state == DONE, job_id))
+
+    def request_cancel(self, job_id):
+        """Flag a job as cancelled; returns its state afterwards (None if unknown)"""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET cancel = 1, state = ? WHERE id = ? AND state NOT IN (?, ?, ?)",
+                       (CANCELLING, job_id) + FINISHED)
+            row = db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def expire(self, ttl_seconds):
+        """Delete jobs finished more than ttl_seconds ago and their files"""
+        cutoff = time.time() - ttl_seconds
+        with self._connect() as db:
+            rows = db.execute("SELECT id, files FROM jobs WHERE finished < ?", (cutoff,)).fetchall()
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id, _ in rows])
+        for _, files in rows:
+            for path in json.loads(files or '[]'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return len(rows)
+
+    def counts(self):
+        with self._connect() as db:
+            return dict(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+def report_progress(fraction, message=None):
+    """Publish progress (0-1) of the current job; call from task functions
+
+    Also the cancellation point: raises JobCancelled if the job was
+    cancelled while running. Does nothing outside a job.
+    """
+    if _current_job is None:
+        return
+    if not _store.progress(_current_job, float(fraction), message):
+        raise JobCancelled(_current_job)
+
+
+def _init_worker(store_path):
+    global _store
+    _store = JobStore(store_path)
+
+
+def _resolve(target):
+    module, _, name = target.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def _run(job_id, target, kwargs):
+    """Worker entry point: run one task and record its outcome in the store"""
+    global _current_job
+    _current_job = job_id
+    try:
+        report_progress(0.0, 'started')
+        result = _resolve(target)(**kwargs)
+    except JobCancelled:
+        _store.finish(job_id, CANCELLED)
+    except Exception as e:
+        _store.finish(job_id, FAILED, error=f"{type(e).__name__}: {e}")
+    else:
+        _store.finish(job_id, DONE, result)
+    finally:
+        _current_job = None
+
+
+class JobQueue:
+    """Run long tasks on a local process pool, tracked in a JobStore
+
+    tasks maps a task name to a 'module:function' path, imported in the
+    worker. submit() returns a job id at once; the store reports state,
+    progress and the result to any process that opens the same file, so
+    status polling works across web workers. Finished jobs are deleted
+    after ttl_seconds, along with the files passed to submit().
+
+    Cancelling a queued job means it never runs. A running job is only
+    stopped at its next report_progress() call, so a task in the middle of
+    one long library call (a forward pass, a document conversion) keeps
+    its worker busy until that call returns; its result is discarded.
+
+    The pool is started by the first submit() and rebuilt if a worker dies
+    (BrokenProcessPool). Workers are spawned (not forked), so heavy models
+    are loaded once per worker process. Every process that submits jobs
+    runs its own pool.
+    """
+
+    def __init__(self, tasks, store_path, max_workers=None, ttl_seconds=3600):
+        self.tasks = dict(tasks)
+        self.store = JobStore(store_path)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.ttl_seconds = ttl_seconds
+        self._futures = {}
+        self._executor = None
+        self._lock = threading.RLock()  # future.cancel() runs _finish inline
+        self._closed = False
+        self.stats = {'submitted': 0, 'pool_restarts': 0}
+
+    def _pool(self, broken=None):
+        """The executor, (re)created if missing or equal to the broken one"""
+        with self._lock:
+            if self._executor is None or self._executor is broken:
+                if broken is not None:
+                    broken.shutdown(wait=False, cancel_futures=True)
+                    self.stats['pool_restarts'] += 1
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.store.path,)
+                )
+            return self._executor
+
+    def submit(self, task, kwargs=None, files=()):
+        """Queue a task; returns the job id
+
+        files are removed from disk when the job expires.
+        """
+        if self._closed:
+            raise RuntimeError("Job queue is closed")
+        if task not in self.tasks:
+            raise ValueError(f"Unknown task: {task}")
+        self.expire()
+
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, task, files)
+        self._dispatch(job_id, self.tasks[task], kwargs or {})
+        with self._lock:
+            self.stats['submitted'] += 1
+        return job_id
+
+    def _dispatch(self, job_id, target, kwargs):
+        pool = self._pool()
+        try:
+            future = pool.submit(_run, job_id, target, kwargs)
+        except BrokenProcessPool:
+            future = self._pool(broken=pool).submit(_run, job_id, target, kwargs)
+        with self._lock:
+            self._futures[job_id] = (future, pool, target, kwargs)
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+
+    def status(self, job_id):
+        self.expire()
+        return status_view(self.store.get(job_id), self.ttl_seconds)
+
+    def result(self, job_id):
+        return self.store.result(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job; returns its state afterwards (None if unknown)"""
+        with self._lock:
+            future = self._futures.get(job_id, (None,))[0]
+        if future is not None and future.cancel():
+            # Still queued here: it never reaches a worker (_finish records it)
+            return CANCELLED
+        return self.store.request_cancel(job_id)
+
+    def expire(self):
+        return self.store.expire(self.ttl_seconds)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, running_here=len(self._futures))
+        return dict(stats, jobs=self.store.counts(), ttl_seconds=self.ttl_seconds)
+
+    def close(self, wait=True):
+        self._closed = True
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _finish(self, job_id, future):
+        """Outcomes the worker could not record itself"""
+        with self._lock:
+            _, pool, target, kwargs = self._futures.pop(job_id)
+        if future.cancelled():
+            self.store.finish(job_id, CANCELLED)
+            return
+        error = future.exception()
+        if error is None:
+            return
+        job = self.store.get(job_id)
+        if (isinstance(error, BrokenProcessPool) and not self._closed
+                and job is not None and job['state'] == PENDING):
+            # A worker died while this job was still queued: run it on a new pool
+            self._pool(broken=pool)
+            self._dispatch(job_id, target, kwargs)
+            return
+        # The job's own worker died, or the call never ran
+        self.store.finish(job_id, FAILED, error=f"{type(error).__name__}: {error}")
+
+
+def status_view(job, ttl_seconds):
+    """JobStore.get() output plus the expiry time of finished jobs"""
+    if job is not None and job['finished'] is not None:
+        job['expires'] = job['finished'] + ttl_seconds
+    return job
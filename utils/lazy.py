@@ -0,0 +1,77 @@
+import threading
+import time
+
+class LazyResource:
+    """Build an expensive object on first use, exactly once, thread-safely
+
+    get() blocks until the object exists; warm_up() starts building it in a
+    background thread so the first request does not pay for it. A failed
+    build is re-raised for retry_after seconds, then the next get() tries
+    again (reset() forces a retry at once).
+    """
+
+    def __init__(self, factory, name=None, retry_after=30):
+        self.factory = factory
+        self.name = name or getattr(factory, '__name__', 'resource')
+        self.retry_after = retry_after
+        self._value = None
+        self._error = None
+        self._failed_at = None
+        self._loading = False
+        self._load_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._value is not None
+
+    def get(self):
+        if self._value is not None:
+            return self._value
+        with self._lock:
+            if self._value is None:
+                if self._error is not None:
+                    if time.monotonic() - self._failed_at < self.retry_after:
+                        raise self._error
+                    self._error = None
+                self._loading = True
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self._error = e
+                    self._failed_at = time.monotonic()
+                    raise
+                finally:
+                    self._loading = False
+                    self._load_seconds = round(time.perf_counter() - start, 3)
+        return self._value
+
+    def warm_up(self):
+        """Start loading in a daemon thread; returns immediately"""
+        def load():
+            try:
+                self.get()
+            except Exception:
+                pass  # kept in self._error and reported by status()
+        thread = threading.Thread(target=load, name=f"warm-up-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._error = None
+
+    def status(self):
+        retry_in = None
+        if self._error is not None:
+            retry_in = round(max(0.0, self.retry_after - (time.monotonic() - self._failed_at)), 1)
+        return {
+            'name': self.name,
+            'ready': self.ready,
+            'loading': self._loading,
+            'load_seconds': self._load_seconds,
+            'error': str(self._error) if self._error else None,
+            'retry_in': retry_in
+        }
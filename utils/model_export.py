@@ -0,0 +1,184 @@
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import torch
+import torch.nn as nn
+
+# CPU serving artifacts: dynamic INT8 quantization of every nn.Linear
+# (weights stored as int8, activations quantized on the fly) followed by
+# TorchScript tracing, so the served modules need no Python model code.
+#
+#   python -m utils.model_export --out models/neural_codec --report report.json
+#
+# then start the app with NEURAL_CODEC_ARTIFACT=models/neural_codec.
+
+ENCODER_FILE = 'encoder.pt'
+DECODER_FILE = 'decoder.pt'
+SAMPLE_TEXTS = [
+    "Neural codecs trade exact reconstruction for a much smaller representation.",
+    "The quick brown fox jumps over the lazy dog.",
+    "Kompresi teks dengan jaringan saraf tiruan menggunakan autoencoder.",
+    "CPU-only serving benefits from int8 weights and fused TorchScript graphs. " * 4
+]
+
+
+def quantize(module):
+    """Dynamic INT8 quantization of the Linear layers (CPU inference only)"""
+    module = module.to('cpu').eval()
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+
+def trace(module, *example):
+    with torch.no_grad():
+        traced = torch.jit.trace(module.eval(), example)
+    return torch.jit.freeze(traced)
+
+
+def optimize(module, *example):
+    """Quantized and traced copy of module"""
+    return trace(quantize(module), *example)
+
+
+def load(path):
+    module = torch.jit.load(path, map_location='cpu')
+    module.eval()
+    return module
+
+
+def time_call(fn, inputs, repeats=20):
+    """Median milliseconds per call of fn(*inputs)"""
+    with torch.no_grad():
+        fn(*inputs)  # warm-up (TorchScript profiles the first runs)
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn(*inputs)
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def compare(reference, optimized, inputs, repeats=20):
+    """Accuracy-vs-latency report for two callables with the same outputs"""
+    with torch.no_grad():
+        expected = reference(*inputs)
+        actual = optimized(*inputs)
+    expected = expected[0] if isinstance(expected, tuple) else expected
+    actual = actual[0] if isinstance(actual, tuple) else actual
+    error = (expected - actual).abs()
+    cosine = nn.functional.cosine_similarity(expected.flatten(), actual.flatten(), dim=0)
+
+    reference_ms = time_call(reference, inputs, repeats)
+    optimized_ms = time_call(optimized, inputs, repeats)
+    return {
+        'reference_ms': round(reference_ms, 3),
+        'optimized_ms': round(optimized_ms, 3),
+        'speedup': round(reference_ms / optimized_ms, 2),
+        'max_abs_error': round(error.max().item(), 6),
+        'mean_abs_error': round(error.mean().item(), 6),
+        'cosine_similarity': round(cosine.item(), 6),
+        # For softmax/one-hot outputs: how often the chosen symbol is unchanged
+        'argmax_agreement': round((expected.argmax(-1) == actual.argmax(-1)).float().mean().item(), 6)
+    }
+
+
+# --- Character autoencoders (neuraltext.LossyTextAutoencoder, neuralcodec.NeuralCodec) ---
+
+def optimize_autoencoder(model, example):
+    """Replace model.encoder/model.decoder by optimized modules, in place
+
+    The model keeps its other methods (encode, quantize_latent, forward),
+    which only call the two submodules. example is a one-hot batch.
+    """
+    with torch.no_grad():
+        latent = model.encoder.eval()(example)
+    encoder = optimize(model.encoder, example)
+    decoder = optimize(model.decoder.eval(), latent)
+    model.encoder, model.decoder = encoder, decoder
+    return model.eval()
+
+
+def optimize_and_report(model, example, repeats=20):
+    """Optimized copy of a trained autoencoder and its report against model"""
+    model.eval()
+    optimized = optimize_autoencoder(copy.deepcopy(model), example)
+    report = compare(
+        lambda x: model.decoder(model.encoder(x)),
+        lambda x: optimized.decoder(optimized.encoder(x)),
+        (example,), repeats
+    )
+    return optimized, report
+
+
+def save_autoencoder(model, directory):
+    os.makedirs(directory, exist_ok=True)
+    model.encoder.save(os.path.join(directory, ENCODER_FILE))
+    model.decoder.save(os.path.join(directory, DECODER_FILE))
+
+
+def load_autoencoder(model, directory):
+    """Swap in the saved artifacts of save_autoencoder, in place"""
+    model.encoder = load(os.path.join(directory, ENCODER_FILE))
+    model.decoder = load(os.path.join(directory, DECODER_FILE))
+    return model.eval()
+
+
+# --- utils.neural_codec.NeuralCodec ---
+
+def export_neural_codec(codec, directory, texts=SAMPLE_TEXTS):
+    """Write the quantized TorchScript text encoder and decoder of codec"""
+    tokens = codec.tokenizer(list(texts), return_tensors='pt', truncation=True, padding=True)
+    example = (tokens['input_ids'], tokens['attention_mask'])
+    encoder = optimize(codec.text_encoder, *example)
+    with torch.no_grad():
+        latent = codec.text_encoder(*example).reshape(-1, 128)
+    decoder = optimize(codec.decoder, latent)
+
+    os.makedirs(directory, exist_ok=True)
+    encoder.save(os.path.join(directory, ENCODER_FILE))
+    decoder.save(os.path.join(directory, DECODER_FILE))
+    # Which registered weights these are, so payloads stay checkable
+    from utils.neural_codec import IDENTITY_FILE
+    with open(os.path.join(directory, IDENTITY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(codec.identity(), f, indent=2)
+    return encoder, decoder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export an INT8 TorchScript NeuralCodec for CPU serving")
+    parser.add_argument('--out', required=True, help="artifact directory")
+    parser.add_argument('--model', default='bert-base-uncased')
+    parser.add_argument('--registry', help="export registered weights from this model registry")
+    parser.add_argument('--version', type=int, help="registered version (default: latest)")
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--report', help="write the accuracy-vs-latency report to this JSON file")
+    args = parser.parse_args(argv)
+
+    from utils.neural_codec import NeuralCodec
+    codec = NeuralCodec(args.model, registry_dir=args.registry, version=args.version)
+    codec.device = torch.device('cpu')
+    codec.text_encoder.to('cpu').eval()
+    codec.decoder.to('cpu').eval()
+    encoder, decoder = export_neural_codec(codec, args.out)
+
+    report = {}
+    for label, texts in (('single', SAMPLE_TEXTS[:1]), ('batch', SAMPLE_TEXTS)):
+        tokens = codec.tokenizer(texts, return_tensors='pt', truncation=True, padding=True)
+        inputs = (tokens['input_ids'], tokens['attention_mask'])
+        report[f'encoder_{label}'] = compare(codec.text_encoder, encoder, inputs, args.repeats)
+        with torch.no_grad():
+            latent = codec.text_encoder(*inputs).reshape(-1, 128)
+        report[f'decoder_{label}'] = compare(codec.decoder, decoder, (latent,), args.repeats)
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+import numpy as np
+
+# Versioned model weights on disk
+#
+#   <root>/<name>/v<version>.safetensors
+#
+# Files use the safetensors layout (8-byte little-endian header length, JSON
+# header with dtype/shape/offsets per tensor and a "__metadata__" map, then
+# raw little-endian data), so they can also be opened with the safetensors
+# package. Loading memory-maps the file copy-on-write: worker processes that
+# load the same version share the page cache instead of each holding a copy.
+
+DTYPES = {
+    'F64': np.float64, 'F32': np.float32, 'F16': np.float16,
+    'I64': np.int64, 'I32': np.int32, 'I16': np.int16, 'I8': np.int8,
+    'U8': np.uint8, 'BOOL': np.bool_
+}
+DTYPE_NAMES = {np.dtype(v).newbyteorder('<'): k for k, v in DTYPES.items()}
+ALIGNMENT = 8
+VERSION_FILE = re.compile(r'^v(\d+)\.safetensors$')
+
+
+def config_hash(config):
+    """Stable short hash of an architecture config (JSON-serializable dict)"""
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def write_safetensors(path, tensors, metadata=None):
+    """Write a dict of arrays; written to a temporary name, then renamed"""
+    header = {}
+    arrays = []
+    offset = 0
+    for key in sorted(tensors):
+        array = np.ascontiguousarray(tensors[key])
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        name = DTYPE_NAMES.get(array.dtype)
+        if name is None:
+            raise ValueError(f"Unsupported dtype for {key}: {array.dtype}")
+        header[key] = {'dtype': name, 'shape': list(array.shape),
+                       'data_offsets': [offset, offset + array.nbytes]}
+        arrays.append(array)
+        offset += array.nbytes
+    if metadata:
+        header['__metadata__'] = {k: str(v) for k, v in metadata.items()}
+
+    raw_header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Pad so the data (and every tensor in practice) starts aligned
+    raw_header += b' ' * (-(8 + len(raw_header)) % ALIGNMENT)
+
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(struct.pack('<Q', len(raw_header)))
+        f.write(raw_header)
+        for array in arrays:
+            f.write(array.tobytes())
+    os.replace(tmp, path)
+
+
+def read_safetensors(path, mmap=True):
+    """Return (dict of arrays, metadata); arrays are copy-on-write memory maps"""
+    with open(path, 'rb') as f:
+        (header_size,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size))
+    metadata = header.pop('__metadata__', {})
+    start = 8 + header_size
+
+    if mmap:
+        data = np.memmap(path, dtype=np.uint8, mode='c', offset=start) if header else None
+    else:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = np.frombuffer(bytearray(f.read()), dtype=np.uint8)
+
+    tensors = {}
+    for key, info in header.items():
+        begin, end = info['data_offsets']
+        dtype = np.dtype(DTYPES[info['dtype']]).newbyteorder('<')
+        tensors[key] = data[begin:end].view(dtype).reshape(info['shape'])
+    return tensors, metadata
+
+
+class IncompatibleModelError(ValueError):
+    """Payload or weights were produced by a different model version/config"""
+
+
+class ModelRegistry:
+    """Directory of versioned weight files, one subdirectory per model name"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name, version):
+        return os.path.join(self.root, name, f"v{version}.safetensors")
+
+    def versions(self, name):
+        try:
+            files = os.listdir(os.path.join(self.root, name))
+        except OSError:
+            return []
+        return sorted(int(m.group(1)) for m in map(VERSION_FILE.match, files) if m)
+
+    def latest(self, name):
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def save(self, name, tensors, config, version=None):
+        """Store weights (arrays or torch tensors) under a new version; returns it"""
+        os.makedirs(os.path.join(self.root, name), exist_ok=True)
+        if version is None:
+            version = (self.latest(name) or 0) + 1
+        arrays = {
+            key: value.detach().cpu().numpy() if hasattr(value, 'detach') else np.asarray(value)
+            for key, value in tensors.items()
+        }
+        write_safetensors(self.path(name, version), arrays, {
+            'name': name,
+            'version': version,
+            'config': json.dumps(config, sort_keys=True),
+            'config_hash': config_hash(config),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        })
+        return version
+
+    def load(self, name, version=None, config=None):
+        """Return (arrays, info) for a version (default: latest)
+
+        If config is given, its hash must match the stored one.
+        """
+        if version is None:
+            version = self.latest(name)
+            if version is None:
+                raise FileNotFoundError(f"No registered versions of {name} in {self.root}")
+        tensors, metadata = read_safetensors(self.path(name, version))
+        info = {
+            'name': name,
+            'version': int(metadata.get('version', version)),
+            'config': json.loads(metadata.get('config', '{}')),
+            'config_hash': metadata.get('config_hash'),
+            'created': metadata.get('created')
+        }
+        if config is not None and info['config_hash'] != config_hash(config):
+            raise IncompatibleModelError(
+                f"{name} v{version} was saved for a different architecture "
+                f"({info['config_hash']} != {config_hash(config)})"
+            )
+        return tensors, info
@@ -1,19 +1,141 @@
+import argparse
+import json
+import os
+import sys
 import torch
 import torch.nn as nn
 import numpy as np
 from transformers import AutoTokenizer, AutoModel
-import json
+from utils.wire_format import pack_latent, unpack_latent
+from utils.model_registry import ModelRegistry, IncompatibleModelError, config_hash
+
+class TextEncoder(nn.Module):
+    """BERT followed by the compression encoder, as one exportable module"""
+    
+    def __init__(self, model, encoder):
+        super().__init__()
+        self.model = model
+        self.encoder = encoder
+    
+    def forward(self, input_ids, attention_mask):
+        hidden = self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)[0]
+        return self.encoder(hidden)
+
+REGISTRY_NAME = 'neural_codec'
+IDENTITY_FILE = 'model.json'
 
 class NeuralCodec:
-    def __init__(self, model_name='bert-base-uncased'):
+    def __init__(self, model_name='bert-base-uncased', artifact_dir=None, registry_dir=None, version=None):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Payloads are only decodable by the same architecture and weights
+        self.config = {
+            'model_name': model_name,
+            'encoder': [768, 512, 256, 128],
+            'decoder': [128, 256, 512, 768]
+        }
+        self.config_hash = config_hash(self.config)
+        self.version = 0  # 0 = unregistered, seeded weights
+        
+        if artifact_dir:
+            # INT8 TorchScript modules written by utils.model_export (CPU only)
+            from utils.model_export import load, ENCODER_FILE, DECODER_FILE
+            self.device = torch.device('cpu')
+            self.text_encoder = load(os.path.join(artifact_dir, ENCODER_FILE))
+            self.decoder = load(os.path.join(artifact_dir, DECODER_FILE))
+            identity_path = os.path.join(artifact_dir, IDENTITY_FILE)
+            if not os.path.exists(identity_path):
+                # Exported before artifacts recorded their weights: which ones they
+                # hold is unknown, so payloads could not be checked against them
+                raise FileNotFoundError(
+                    f"{artifact_dir} has no {IDENTITY_FILE}; re-export it with "
+                    f"python -m utils.model_export --out {artifact_dir}"
+                )
+            with open(identity_path, 'r', encoding='utf-8') as f:
+                identity = json.load(f)
+            self.version, self.config_hash = identity['version'], identity['config_hash']
+            return
+        
         self.model = AutoModel.from_pretrained(model_name).to(self.device)
         self.model.eval()
         
-        # Initialize encoder and decoder networks
-        self.encoder = self._build_encoder()
-        self.decoder = self._build_decoder()
+        # Initialize encoder and decoder networks; the fixed seed makes
+        # unregistered weights identical in every worker
+        with torch.random.fork_rng(devices=[]):
+            torch.manual_seed(0)
+            self.encoder = self._build_encoder()
+            self.decoder = self._build_decoder()
+        
+        registry = ModelRegistry(registry_dir) if registry_dir else None
+        if registry and (version or registry.latest(REGISTRY_NAME)):
+            self._load_weights(registry, version)
+        self.text_encoder = TextEncoder(self.model, self.encoder)
+    
+    def _load_weights(self, registry, version):
+        """Use registered encoder/decoder weights (memory-mapped on CPU)"""
+        arrays, info = registry.load(REGISTRY_NAME, version, self.config)
+        for prefix, module in (('encoder.', self.encoder), ('decoder.', self.decoder)):
+            state = {key[len(prefix):]: torch.from_numpy(value)
+                     for key, value in arrays.items() if key.startswith(prefix)}
+            # assign=True keeps the mapped pages as the parameters on CPU
+            module.load_state_dict(state, assign=self.device.type == 'cpu')
+            module.to(self.device).eval()
+        self.version = info['version']
+    
+    def save(self, registry_dir):
+        """Register the current encoder/decoder weights as a new version"""
+        tensors = {f'encoder.{k}': v for k, v in self.encoder.state_dict().items()}
+        tensors.update({f'decoder.{k}': v for k, v in self.decoder.state_dict().items()})
+        self.version = ModelRegistry(registry_dir).save(REGISTRY_NAME, tensors, self.config)
+        return self.version
+    
+    def identity(self):
+        return {'version': self.version, 'config_hash': self.config_hash, 'config': self.config}
+    
+    def fit(self, texts, epochs=3, lr=1e-3, batch_size=8):
+        """Train encoder/decoder to reconstruct the (frozen) BERT embeddings"""
+        params = list(self.encoder.parameters()) + list(self.decoder.parameters())
+        optimizer = torch.optim.Adam(params, lr=lr)
+        self.encoder.train()
+        self.decoder.train()
+        for epoch in range(epochs):
+            total = 0.0
+            for start in range(0, len(texts), batch_size):
+                tokens = self.tokenizer(texts[start:start + batch_size], return_tensors='pt',
+                                        truncation=True, padding=True)
+                mask = tokens['attention_mask'].to(self.device).unsqueeze(-1).float()
+                with torch.no_grad():
+                    hidden = self.model(input_ids=tokens['input_ids'].to(self.device),
+                                        attention_mask=tokens['attention_mask'].to(self.device),
+                                        return_dict=False)[0]
+                decoded = self.decoder(self.encoder(hidden))
+                # Padding positions do not count
+                loss = (((decoded - hidden) ** 2) * mask).sum() / (mask.sum() * hidden.shape[-1])
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                total += loss.item()
+            print(f"Epoch {epoch + 1}/{epochs}, Loss: {total / max(1, -(-len(texts) // batch_size)):.6f}")
+        self.encoder.eval()
+        self.decoder.eval()
+    
+    def check_payload(self, item):
+        """Raise IncompatibleModelError for payloads of other weights"""
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            metadata = unpack_latent(item)[1]
+        else:
+            metadata = item.get('metadata', {})
+        version, payload_hash = metadata.get('model_version'), metadata.get('config_hash')
+        if version is None:
+            raise IncompatibleModelError(
+                "Payload does not record the model that produced it (wire format v1); "
+                f"compress the text again with this server (v{self.version}, {self.config_hash})"
+            )
+        if version != self.version or payload_hash != self.config_hash:
+            raise IncompatibleModelError(
+                f"Payload was produced by model v{version} ({payload_hash}); "
+                f"this server runs v{self.version} ({self.config_hash})"
+            )
         
     def _build_encoder(self):
         """Build neural encoder for compression"""
@@ -39,38 +161,56 @@ class NeuralCodec:
     
     def compress(self, text, compression_level=0.5, quality=0.8):
         """Compress text using neural codec"""
+        return self.compress_batch([text], [compression_level], [quality])[0]
+    
+    def compress_batch(self, texts, compression_levels, qualities):
+        """Compress several texts with one padded forward pass"""
         # Tokenize and encode
-        tokens = self.tokenizer(text, return_tensors='pt', truncation=True, padding=True)
-        tokens = {k: v.to(self.device) for k, v in tokens.items()}
+        tokens = self.tokenizer(list(texts), return_tensors='pt', truncation=True, padding=True)
+        lengths = tokens['attention_mask'].sum(dim=1).tolist()
+        input_ids = tokens['input_ids'].to(self.device)
+        attention_mask = tokens['attention_mask'].to(self.device)
         
         with torch.no_grad():
-            # Get embeddings
-            outputs = self.model(**tokens)
-            embeddings = outputs.last_hidden_state
-            
-            # Apply compression
-            compressed_embeddings = self.encoder(embeddings)
-            
-            # Quantization based on compression level
-            quantized = self._quantize(compressed_embeddings, compression_level)
+            # Get embeddings and apply compression
+            compressed_embeddings = self.text_encoder(input_ids, attention_mask)
             
-            # Convert to serializable format
-            compressed_data = {
-                'encoded': quantized.cpu().numpy().tolist(),
-                'metadata': {
-                    'compression_level': compression_level,
-                    'quality': quality,
-                    'original_length': len(text),
-                    'shape': list(quantized.shape)
-                }
-            }
+            results = []
+            for i, text in enumerate(texts):
+                # Drop the padding positions of this item
+                item = compressed_embeddings[i:i + 1, :lengths[i]]
+                
+                # Quantization based on compression level
+                quantized = self._quantize(item, compression_levels[i])
+                
+                # Pack into the binary wire format
+                results.append(pack_latent(
+                    quantized.cpu().numpy(),
+                    bits=self._wire_bits(compression_levels[i]),
+                    metadata={
+                        'compression_level': compression_levels[i],
+                        'quality': qualities[i],
+                        'original_length': len(text)
+                    },
+                    model_version=self.version,
+                    config_hash=self.config_hash
+                ))
             
-        return compressed_data
+        return results
     
     def decompress(self, compressed_data):
         """Decompress data using neural codec"""
-        # Reconstruct tensor
-        encoded_tensor = torch.tensor(compressed_data['encoded']).to(self.device)
+        return self.decompress_batch([compressed_data])[0]
+    
+    def decompress_batch(self, items):
+        """Decompress several payloads with one decoder pass"""
+        for item in items:
+            self.check_payload(item)
+        
+        # The decoder works per token, so all tokens can share one matrix
+        tensors = [torch.from_numpy(self._latent(item)).reshape(-1, 128) for item in items]
+        sizes = [t.shape[0] for t in tensors]
+        encoded_tensor = torch.cat(tensors).to(self.device)
         
         with torch.no_grad():
             # Decode
@@ -78,9 +218,17 @@ class NeuralCodec:
             
             # Convert back to text (simplified approach)
             # In practice, you'd need a more sophisticated text reconstruction method
-            decoded_text = self._embeddings_to_text(decoded_embeddings)
-            
-        return decoded_text
+            return [self._embeddings_to_text(chunk) for chunk in torch.split(decoded_embeddings, sizes)]
+    
+    def _latent(self, item):
+        """Float latent from a binary payload or a JSON (debug) payload"""
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            return unpack_latent(item)[0]
+        return np.asarray(item['encoded'], dtype=np.float32)
+    
+    def _wire_bits(self, compression_level):
+        """int4 when the _quantize grid over [-1, 1] has at most 16 levels"""
+        return 4 if 2 * 2 ** (8 * compression_level) + 1 <= 16 else 8
     
     def _quantize(self, tensor, compression_level):
         """Quantize tensor based on compression level"""
@@ -94,3 +242,25 @@ class NeuralCodec:
         # This is a simplified approach - in practice, you'd need a proper decoder
         # that can convert embeddings back to meaningful text
         return "Decompressed text placeholder - implement proper text reconstruction"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the NeuralCodec encoder/decoder and register the weights")
+    parser.add_argument('corpus', help="text file, one training sample per non-empty line")
+    parser.add_argument('--registry', default='models', help="model registry directory")
+    parser.add_argument('--model', default='bert-base-uncased')
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args(argv)
+    
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        texts = [line.strip() for line in f if line.strip()]
+    codec = NeuralCodec(args.model, registry_dir=args.registry)
+    codec.fit(texts, args.epochs, args.lr, args.batch_size)
+    codec.save(args.registry)
+    print(json.dumps(codec.identity()))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
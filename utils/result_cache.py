@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+class ResultCache:
+    """Content-addressed cache for compression results
+
+    Two tiers: an in-memory LRU bounded by the total size of the stored
+    values (JSON encoded), and an optional directory of <key>.json files
+    that survives restarts and is shared between workers. bytes values are
+    stored as-is, in <key>.bin files.
+
+    The disk tier is capped at disk_max_bytes: when a write takes it over,
+    the least recently used files (by mtime, refreshed on every disk hit)
+    are deleted until it is back under DISK_PRUNE_TO of the cap.
+    """
+
+    DISK_PRUNE_TO = 0.9
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, disk_max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._bytes = 0
+        self._disk_bytes = 0            # estimate; other workers write here too
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+
+    @staticmethod
+    def make_key(*parts):
+        """SHA-256 over the parts (text and parameters)"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(repr(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _disk_path(self, key, binary=False):
+        return os.path.join(self.disk_dir, f"{key}.bin" if binary else f"{key}.json")
+    
+    def _read_disk(self, key):
+        """(value, size) from the disk tier, or None"""
+        for binary in (True, False):
+            path = self._disk_path(key, binary)
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                os.utime(path)  # mark as recently used
+            except OSError:
+                continue
+            return (raw if binary else json.loads(raw)), len(raw)
+        return None
+
+    def _scan_disk(self):
+        """(path, size, mtime) of every cache file"""
+        files = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(('.bin', '.json')):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, st.st_size, st.st_mtime))
+        return files
+
+    def _prune_disk(self):
+        """Delete least recently used files until the tier fits its cap"""
+        if not self._prune_lock.acquire(blocking=False):
+            return  # another thread is already pruning
+        try:
+            files = sorted(self._scan_disk(), key=lambda f: f[2])
+            total = sum(size for _, size, _ in files)
+            target = self.disk_max_bytes * self.DISK_PRUNE_TO
+            removed = 0
+            for path, size, _ in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            with self._lock:
+                self._disk_bytes = total
+                self.stats['disk_evictions'] += removed
+        finally:
+            self._prune_lock.release()
+
+    def _remember(self, key, value, size):
+        """Insert into the memory tier and evict least recently used entries"""
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.stats['evictions'] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+
+        if self.disk_dir:
+            found = self._read_disk(key)
+            if found is not None:
+                value, size = found
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                    self._remember(key, value, size)
+                return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        binary = isinstance(value, bytes)
+        raw = value if binary else json.dumps(value).encode('utf-8')
+        with self._lock:
+            self._remember(key, value, len(raw))
+
+        if self.disk_dir:
+            # Write-then-rename so readers never see a partial file
+            path = self._disk_path(key, binary)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp, path)
+            with self._lock:
+                self._disk_bytes += len(raw)
+                over = self.disk_max_bytes is not None and self._disk_bytes > self.disk_max_bytes
+            if over:
+                self._prune_disk()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['disk_hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                disk_bytes=self._disk_bytes if self.disk_dir else None,
+                disk_max_bytes=self.disk_max_bytes if self.disk_dir else None,
+                hit_rate=round((lookups - self.stats['misses']) / lookups, 4) if lookups else 0.0
+            )
@@ -0,0 +1,125 @@
+import struct
+import numpy as np
+
+# Binary wire format for NeuralCodec latents
+#
+#   header    '>4sBBB'   magic b'NCLT', version, bits (8 or 4), ndim
+#   model     '>H8s'     model version, config hash (first 8 bytes); v2 only
+#   shape     '>I' * ndim
+#   quant     '>fH'      scale, zero point
+#   metadata  '>ffI'     compression_level, quality, original_length
+#   payload   unsigned codes, one per byte (int8) or two per byte (int4,
+#             high nibble first)
+#
+# Values are affine-quantized per tensor: x ~= (q - zero_point) * scale.
+# The model fields let a decoder refuse latents from other weights; v1
+# payloads have none and are still parsed.
+
+MAGIC = b'NCLT'
+VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+HEADER = struct.Struct('>4sBBB')
+MODEL = struct.Struct('>H8s')
+QUANT = struct.Struct('>fH')
+METADATA = struct.Struct('>ffI')
+SUPPORTED_BITS = (4, 8)
+
+
+def quantize(array, bits=8):
+    """Affine-quantize to unsigned bits-wide codes; returns (codes, scale, zero_point)"""
+    if bits not in SUPPORTED_BITS:
+        raise ValueError(f"Unsupported bit width: {bits}")
+    array = np.asarray(array, dtype=np.float32)
+    qmax = (1 << bits) - 1
+    # Keep 0.0 representable exactly
+    lo = min(float(array.min()), 0.0) if array.size else 0.0
+    hi = max(float(array.max()), 0.0) if array.size else 0.0
+    scale = (hi - lo) / qmax or 1.0
+    zero_point = int(np.clip(round(-lo / scale), 0, qmax))
+    codes = np.clip(np.rint(array / scale) + zero_point, 0, qmax).astype(np.uint8)
+    return codes, scale, zero_point
+
+
+def dequantize(codes, scale, zero_point):
+    return (codes.astype(np.float32) - zero_point) * np.float32(scale)
+
+
+def pack_latent(array, bits=8, metadata=None, model_version=0, config_hash=''):
+    """Serialize a float latent tensor, its metadata and the model identity"""
+    array = np.asarray(array, dtype=np.float32)
+    metadata = metadata or {}
+    codes, scale, zero_point = quantize(array, bits)
+    codes = codes.ravel()
+    if bits == 4:
+        if codes.size % 2:
+            codes = np.append(codes, np.uint8(zero_point))
+        codes = (codes[0::2] << 4) | codes[1::2]
+
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, bits, array.ndim),
+        MODEL.pack(model_version, bytes.fromhex(config_hash[:16].ljust(16, '0'))),
+        struct.pack(f'>{array.ndim}I', *array.shape),
+        QUANT.pack(scale, zero_point),
+        METADATA.pack(
+            metadata.get('compression_level', 0.0),
+            metadata.get('quality', 0.0),
+            metadata.get('original_length', 0)
+        ),
+        codes.tobytes()
+    ])
+
+
+def unpack_latent(blob):
+    """Inverse of pack_latent; returns (float32 array, metadata dict)"""
+    view = memoryview(blob)
+    magic, version, bits, ndim = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a NeuralCodec payload")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported payload version: {version}")
+    if bits not in SUPPORTED_BITS:
+        raise ValueError(f"Unsupported bit width: {bits}")
+
+    offset = HEADER.size
+    model_version = config_hash = None
+    if version >= 2:
+        model_version, raw_hash = MODEL.unpack_from(view, offset)
+        config_hash = raw_hash.hex()
+        offset += MODEL.size
+    shape = struct.unpack_from(f'>{ndim}I', view, offset)
+    offset += 4 * ndim
+    scale, zero_point = QUANT.unpack_from(view, offset)
+    offset += QUANT.size
+    level, quality, original_length = METADATA.unpack_from(view, offset)
+    offset += METADATA.size
+
+    count = int(np.prod(shape))
+    packed = np.frombuffer(view[offset:], dtype=np.uint8)
+    if bits == 4:
+        codes = np.empty(packed.size * 2, dtype=np.uint8)
+        codes[0::2] = packed >> 4
+        codes[1::2] = packed & 0x0F
+    else:
+        codes = packed
+    if codes.size < count:
+        raise ValueError("Truncated NeuralCodec payload")
+
+    array = dequantize(codes[:count], scale, zero_point).reshape(shape)
+    metadata = {
+        'compression_level': round(level, 6),
+        'quality': round(quality, 6),
+        'original_length': original_length,
+        'shape': list(shape),
+        'bits': bits,
+        'scale': scale,
+        'zero_point': zero_point,
+        'model_version': model_version,
+        'config_hash': config_hash
+    }
+    return array, metadata
+
+
+def payload_to_json(blob):
+    """Readable form of a binary payload, for debugging"""
+    array, metadata = unpack_latent(blob)
+    return {'encoded': array.tolist(), 'metadata': metadata}